@@ -1,6 +1,11 @@
 # -*- coding: utf-8 -*-
 
+from . import archive
+from . import backend
+from . import cache
+from . import derived
 from . import download
+from . import interp
 from . import read
 from . import support
 
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+__all__ = ['write', 'append']
+
+# packing of variables (dtype, scale_factor, add_offset), below the precision of IGRAv2 / UADB
+_packing = {'temp': ('int16', 0.01, 250.),  # K
+            'gph': ('int16', 1., 30000.),  # m
+            'rhumi': ('int16', 0.0001, 0.),  # 1
+            'dpd': ('int16', 0.01, 0.),  # K
+            'windd': ('int16', 0.01, 180.),  # degree
+            'winds': ('int16', 0.01, 0.),  # m/s
+            'flag_int': ('int8', 1., 0.),
+            'numlev': ('int16', 1., 0.)}
+
+_fill = {'int8': -127, 'int16': -32767}
+
+
+def write(data, filename, station=None, chunksize=1024, complevel=4, **kwargs):
+    """ Write profiles of many stations into one compressed NetCDF4 file (station, date, pres)
+
+    Variables are packed to int16 with scale_factor / add_offset (see _packing) if all
+    values fit, others are stored as float32. Variables are chunked along date, the
+    date dimension is unlimited and can be extended with append.
+
+    Args:
+        data (dict, Dataset): profiles by station (read.igra_many) or with station dimension
+        filename (str): NetCDF filename
+        station (dict, Dataset): station information, same form as data
+        chunksize (int): number of dates in a chunk
+        complevel (int): zlib compression level
+        **kwargs:
+
+    Returns:
+        Dataset : network as written (not packed)
+    """
+    import os
+    from . import support as sp
+
+    data = _network(data, station)
+    encoding = {'date': {'dtype': 'int32', 'units': 'minutes since 1900-01-01 00:00:00',
+                         'calendar': 'proleptic_gregorian'}}
+    for ivar in data.data_vars:
+        encoding[ivar] = _encoding(data[ivar], chunksize, complevel)
+        if 'scale_factor' not in encoding[ivar]:
+            sp.message("Not packed:", ivar, encoding[ivar]['dtype'], **kwargs)
+
+    data.to_netcdf(filename + '.tmp', format='NETCDF4', engine='netcdf4', unlimited_dims=['date'],
+                   encoding=encoding)
+    os.replace(filename + '.tmp', filename)
+    sp.message("Network written:", filename, dict(data.sizes), **kwargs)
+    return data
+
+
+def append(data, filename, station=None, **kwargs):
+    """ Append new dates to a network file (write)
+
+    Only dates after the last stored date are appended, stations have to be in the file
+    already and values have to fit into the packing of the file.
+
+    Args:
+        data (dict, Dataset): profiles by station (read.igra_many) or with station dimension
+        filename (str): NetCDF filename (write)
+        station (dict, Dataset): station information, same form as data
+        **kwargs:
+
+    Returns:
+        int : number of appended dates
+    """
+    import numpy as np
+    import xarray as xr
+    from . import support as sp
+    from .read import _append_netcdf
+
+    data = _network(data, station)
+    with xr.open_dataset(filename) as stored:
+        stations = stored['station'].values
+        last = stored['date'].values.max()
+        pres = stored['pres'].values
+        packing = {i: stored[i].encoding for i in stored.data_vars}
+
+    unknown = np.setdiff1d(data['station'].values, stations)
+    if unknown.size > 0:
+        raise ValueError("Stations not in %s: %s, rewrite with write" % (filename, ",".join(unknown)))
+
+    new = data['date'].values > last
+    sp.message("Dates after", last, ":", new.sum(), **kwargs)
+    if not new.any():
+        return 0
+
+    data = data.isel(date=np.flatnonzero(new)).reindex(station=stations, pres=pres)
+    for ivar in data.data_vars:
+        if ivar in packing and 'scale_factor' in packing[ivar]:
+            if not _fits(data[ivar].values, packing[ivar]['dtype'], packing[ivar]['scale_factor'],
+                         packing[ivar].get('add_offset', 0.)):
+                raise ValueError("Values of %s exceed the packing in %s" % (ivar, filename))
+
+    if not _append_netcdf(filename, data, dim='date'):
+        raise ValueError("Variables or dates do not match %s" % filename)
+    sp.message("Appended to:", filename, new.sum(), **kwargs)
+    return int(new.sum())
+
+
+def _network(data, station=None):
+    """ Combine profiles and station information into one Dataset (station, date, ...)
+
+    Args:
+        data (dict, Dataset): profiles by station or with station dimension
+        station (dict, Dataset): station information, same form as data
+
+    Returns:
+        Dataset : with station dimension first
+    """
+    import xarray as xr
+    from .read import _concat_stations
+
+    if isinstance(data, dict):
+        data = _concat_stations(data)
+    if isinstance(station, dict):
+        station = _concat_stations(station)
+    if 'station' not in data.dims:
+        data = data.expand_dims(station=[data.attrs['ident']])
+    if station is not None:
+        if 'station' not in station.dims:
+            station = station.expand_dims(station=[station.attrs['ident']])
+        data = xr.merge([data, station], join='left', combine_attrs='drop_conflicts')
+    return data.transpose('station', 'date', ...)
+
+
+def _encoding(data, chunksize=1024, complevel=4):
+    """ Packing, compression and chunks of a variable
+
+    Args:
+        data (DataArray): variable with dimensions station, date, ...
+        chunksize (int): number of dates in a chunk
+        complevel (int): zlib compression level
+
+    Returns:
+        dict : encoding for to_netcdf
+    """
+    # date is unlimited, chunks can be larger for later appends
+    chunks = tuple(1 if i == 'station' else chunksize if i == 'date' else n for i, n in zip(data.dims, data.shape))
+    encoding = {'zlib': True, 'complevel': complevel, 'shuffle': True, 'chunksizes': chunks}
+    if data.dtype.kind not in 'iuf':
+        return encoding
+
+    if data.name in _packing:
+        dtype, scale, offset = _packing[data.name]
+        if _fits(data.values, dtype, scale, offset):
+            encoding.update({'dtype': dtype, 'scale_factor': scale, 'add_offset': offset, '_FillValue': _fill[dtype]})
+            return encoding
+    encoding.update({'dtype': 'float32', '_FillValue': float('nan')})
+    return encoding
+
+
+def _fits(values, dtype, scale, offset):
+    """ Finite values can be packed without overflow (fill value excluded)
+
+    Returns:
+        bool : fits or not
+    """
+    import numpy as np
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return True
+    limit = np.iinfo(dtype).max - 1
+    packed = np.round((values - offset) / scale)
+    return bool(packed.min() >= -limit and packed.max() <= limit)
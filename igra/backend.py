@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+from xarray.backends import BackendArray, BackendEntrypoint
+
+__all__ = ['IgraBackendEntrypoint']
+
+_variables = ['gph', 'temp', 'rhumi', 'dpd', 'windd', 'winds', 'flag_int']
+
+
+class IgraBackendEntrypoint(BackendEntrypoint):
+    """ xarray engine for IGRAv2 and UADB ascii files
+
+    >>> xr.open_dataset("USM00072216-data.txt.zip", engine="igra")
+
+    IGRAv2 files are opened with the sounding index (see read.sounding_index). Variables are
+    lazy arrays (date, pres) and only the selected soundings are read and interpolated, only
+    for the selected variable. UADB files are read and interpolated completely at open.
+    """
+    description = "IGRAv2 and UADB radiosonde ascii files on standard pressure levels"
+    url = "https://github.com/MBlaschek/igra"
+    open_dataset_parameters = ('filename_or_obj', 'drop_variables', 'levels', 'uadb', 'duplicates', 'chunksize')
+
+    def open_dataset(self, filename_or_obj, *, drop_variables=None, levels=None, uadb=False, duplicates='first',
+                     chunksize=None):
+        """ Open a station file as Dataset (date, pres)
+
+        Args:
+            filename_or_obj (str): IGRAv2 or UADB filename (plain, gz or zip)
+            drop_variables (list): variables not to open
+            levels (list): pressure levels to interpolate to [Pa]
+            uadb (bool): UADB or IGRAv2 format
+            duplicates (str): same date and level: first, last, mean or raise
+            chunksize (int): preferred number of soundings per dask chunk
+
+        Returns:
+            Dataset : profiles
+        """
+        import os
+        import numpy as np
+        import xarray as xr
+        from xarray.core import indexing
+        from . import std_plevels
+        from .read import to_std_levels, sounding_index, _metadata
+
+        filename = os.fspath(filename_or_obj)
+        if levels is None:
+            levels = std_plevels
+        ident = os.path.basename(filename).split('-data')[0]
+        drop_variables = [] if drop_variables is None else list(np.atleast_1d(drop_variables))
+
+        if uadb:
+            data, _ = to_std_levels(ident, filename, levels=levels, uadb=True, duplicates=duplicates, verbose=0)
+            return data.drop_vars(drop_variables, errors='ignore')
+
+        index = sounding_index(filename, verbose=0)
+        store = _IgraStore(filename, np.unique(index.index.values), np.unique(levels), duplicates)
+        data = xr.Dataset(coords={'date': ('date', store.dates), 'pres': ('pres', store.levels)})
+        for ivar in _variables:
+            if ivar in drop_variables:
+                continue
+            array = indexing.LazilyIndexedArray(_IgraArray(store, ivar))
+            data[ivar] = xr.Variable(('date', 'pres'), array, _metadata.get(ivar, {}).copy())
+            if chunksize is not None:
+                data[ivar].encoding['preferred_chunks'] = {'date': chunksize, 'pres': store.levels.size}
+        data.attrs.update({'ident': ident, 'source': 'NOAA NCDC', 'dataset': 'IGRAv2', 'processed': 'UNIVIE, IMG',
+                           'interpolated': 'to pres levs (#%d)' % len(levels)})
+        return data
+
+    def guess_can_open(self, filename_or_obj):
+        import os
+        try:
+            filename = os.path.basename(os.fspath(filename_or_obj))
+        except TypeError:
+            return False
+        return '-data.txt' in filename or (filename.startswith('uadb_') and '.txt' in filename)
+
+
+class _IgraStore(object):
+    """ IGRAv2 file with the last block of parsed soundings (shared by all variables) """
+
+    def __init__(self, filename, dates, levels, duplicates='first'):
+        from xarray.backends.locks import SerializableLock
+        self.filename = filename
+        self.dates = dates
+        self.levels = levels
+        self.duplicates = duplicates
+        self.lock = SerializableLock()
+        self.last = (None, None)
+
+    def table(self, isel):
+        """ Soundings at these date positions, pressure levels only
+
+        Args:
+            isel (ndarray): positions of dates
+
+        Returns:
+            DataFrame : Table of radiosonde soundings with date as index and variables as columns
+        """
+        import numpy as np
+        from .read import read_soundings
+
+        key = isel.tobytes()
+        with self.lock:
+            if self.last[0] != key:
+                data, _ = read_soundings(self.filename, dates=self.dates[isel], verbose=0)
+                self.last = (key, data[np.isfinite(data['pres'])])
+            return self.last[1]
+
+
+class _IgraArray(BackendArray):
+    """ One variable (date, pres) of an IGRAv2 file, read and interpolated on access """
+
+    def __init__(self, store, name):
+        import numpy as np
+        self.store = store
+        self.name = name
+        self.shape = (store.dates.size, store.levels.size)
+        self.dtype = np.dtype(float)
+
+    def __getitem__(self, key):
+        from xarray.core import indexing
+        return indexing.explicit_indexing_adapter(key, self.shape, indexing.IndexingSupport.BASIC, self._getitem)
+
+    def _getitem(self, key):
+        import numpy as np
+        from .interp import dataframe
+        from .read import dataframe_to_array
+
+        isel = np.atleast_1d(np.arange(self.shape[0])[key[0]])
+        out = np.full((isel.size, self.shape[1]), np.nan)
+        data = self.store.table(isel) if isel.size > 0 else []
+        if len(data) > 0:
+            # flag_int only depends on pressure
+            ivar = 'gph' if self.name == 'flag_int' else self.name
+            data = dataframe(data, 'pres', levels=self.store.levels, variables=[ivar], verbose=0)
+            data = dataframe_to_array(data.to_xarray(), dim='date', plev='pres', levels=self.store.levels,
+                                      duplicates=self.store.duplicates)
+            values = data[self.name].values
+            if self.name == 'temp':
+                values = values + 273.2  # Kelvin
+            elif self.name == 'rhumi':
+                values = values / 100.  # ratio
+            dates = self.store.dates[isel]
+            order = np.argsort(dates)
+            idate = order[np.searchsorted(dates[order], data['date'].values)]
+            ilev = np.searchsorted(self.store.levels, data['pres'].values)
+            out[np.ix_(idate, ilev)] = values
+        out = out[:, key[1]]
+        if np.ndim(key[0]) == 0 and not isinstance(key[0], slice):
+            out = out[0]
+        return out
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+__all__ = ['table', 'clear', 'default_directory']
+
+default_maxsize = 2 * 1024 ** 3  # bytes
+
+
+def default_directory():
+    """ Cache directory (XDG_CACHE_HOME/igra or ~/.cache/igra)
+
+    Returns:
+        str : directory
+    """
+    import os
+    return os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'igra')
+
+
+def table(filename, cache=True, maxsize=None, uadb=False, all_columns=False, start=None, end=None, **kwargs):
+    """ Read the raw station table from the cache or parse the ascii file
+
+    Cache entries are keyed by the path and the read options and are valid as long
+    as the source file has the same size and modification time or, if these
+    changed, the same content hash. The least recently used entries are removed
+    when the cache directory exceeds maxsize.
+
+    Args:
+        filename (str): filename (IGRAv2 or UADB)
+        cache (str, bool): cache directory or True for the default directory
+        maxsize (int): maximum size of the cache directory [bytes]
+        uadb (bool): UADB or IGRAv2 format
+        all_columns (bool): return all columns or just data (IGRAv2)
+        start (str, datetime): first date to read (IGRAv2)
+        end (str, datetime): last date to read (IGRAv2)
+        **kwargs:
+
+    Returns:
+        DataFrame : Table of radiosonde soundings with date as index and variables as columns
+        DataFrame : Station Information
+    """
+    import os
+    import hashlib
+    import numpy as np
+    from . import support as sp
+    from .read import ascii_to_dataframe, uadb_ascii_to_dataframe
+
+    if not os.path.isfile(filename):
+        raise IOError("File not Found! %s" % filename)
+
+    directory = default_directory() if cache is True else cache
+    os.makedirs(directory, exist_ok=True)
+    options = (os.path.abspath(filename), uadb, all_columns, str(start), str(end))
+    entry = os.path.join(directory, hashlib.sha1(repr(options).encode()).hexdigest() + '.npz')
+    info = os.stat(filename)
+
+    arrays = _read(entry)
+    if arrays is not None:
+        if arrays['size'] == info.st_size and arrays['mtime'] == info.st_mtime_ns:
+            valid = True
+        else:
+            valid = arrays['size'] == info.st_size and str(arrays['hash']) == _file_hash(filename)
+        if valid:
+            if arrays['mtime'] != info.st_mtime_ns:
+                arrays['mtime'] = info.st_mtime_ns  # touched, but same content
+                _write(entry, arrays)
+            else:
+                try:
+                    os.utime(entry)  # recently used
+                except FileNotFoundError:
+                    pass  # removed by another process
+            sp.message("Cache read from:", entry, **kwargs)
+            return _from_arrays(arrays, 'data'), _from_arrays(arrays, 'station')
+
+    if uadb:
+        data, station = uadb_ascii_to_dataframe(filename, **kwargs)
+    else:
+        data, station = ascii_to_dataframe(filename, all_columns=all_columns, start=start, end=end, **kwargs)
+
+    arrays = {'size': info.st_size, 'mtime': info.st_mtime_ns, 'hash': _file_hash(filename)}
+    arrays.update(_to_arrays(data, 'data'))
+    arrays.update(_to_arrays(station, 'station'))
+    _write(entry, arrays)
+    sp.message("Cache written to:", entry, **kwargs)
+    _evict(directory, default_maxsize if maxsize is None else maxsize, keep=entry)
+    return data, station
+
+
+def clear(cache=True):
+    """ Remove all cache entries
+
+    Args:
+        cache (str, bool): cache directory or True for the default directory
+    """
+    import os
+    directory = default_directory() if cache is True else cache
+    if not os.path.isdir(directory):
+        return
+    for ifile in os.listdir(directory):
+        if ifile.endswith('.npz'):
+            try:
+                os.remove(os.path.join(directory, ifile))
+            except FileNotFoundError:
+                pass  # removed by another process
+
+
+def _read(entry):
+    """ Read a cache entry
+
+    Args:
+        entry (str): filename of the entry
+
+    Returns:
+        dict : arrays or None, if there is no entry (or it was just removed by another process)
+    """
+    import numpy as np
+    try:
+        with np.load(entry, allow_pickle=False) as infile:
+            return {i: infile[i] for i in infile.files}
+    except FileNotFoundError:
+        return None
+
+
+def _write(entry, arrays):
+    """ Write a cache entry atomically, through a unique temporary file (many processes)
+
+    Args:
+        entry (str): filename of the entry
+        arrays (dict): arrays
+    """
+    import os
+    import tempfile
+    import numpy as np
+    handle, tmp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(entry))
+    try:
+        with os.fdopen(handle, 'wb') as outfile:
+            np.savez(outfile, **arrays)
+        os.replace(tmp, entry)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def _file_hash(filename):
+    """ Content hash of a file
+
+    Args:
+        filename (str): filename
+
+    Returns:
+        str : hex digest
+    """
+    import hashlib
+    digest = hashlib.blake2b()
+    with open(filename, 'rb') as infile:
+        for chunk in iter(lambda: infile.read(1048576), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _evict(directory, maxsize, keep=None):
+    """ Remove least recently used entries until the directory fits maxsize
+
+    Args:
+        directory (str): cache directory
+        maxsize (int): maximum size [bytes]
+        keep (str): entry not to remove
+    """
+    import os
+    entries = []
+    for ifile in os.listdir(directory):
+        if ifile.endswith('.npz'):
+            try:
+                info = os.stat(os.path.join(directory, ifile))
+            except FileNotFoundError:
+                continue  # removed by another process
+            entries.append((info.st_mtime, info.st_size, os.path.join(directory, ifile)))
+    total = sum(i[1] for i in entries)
+    for itime, isize, ifile in sorted(entries):
+        if total <= maxsize:
+            break
+        if ifile == keep:
+            continue
+        try:
+            os.remove(ifile)
+        except FileNotFoundError:
+            pass  # removed by another process
+        total -= isize
+
+
+def _to_arrays(frame, prefix):
+    """ DataFrame to named arrays (columns, object columns as str)
+
+    Args:
+        frame (DataFrame): table with date index
+        prefix (str): name prefix
+
+    Returns:
+        dict : arrays
+    """
+    import numpy as np
+    arrays = {prefix + '__index': frame.index.values,
+              prefix + '__columns': np.array(frame.columns, dtype=str),
+              prefix + '__objects': np.array([i for i in frame.columns if frame[i].dtype == object], dtype=str)}
+    for i in frame.columns:
+        values = frame[i].values
+        arrays[prefix + '_' + i] = values.astype(str) if values.dtype == object else values
+    return arrays
+
+
+def _from_arrays(arrays, prefix):
+    """ Named arrays to DataFrame
+
+    Args:
+        arrays (dict): arrays
+        prefix (str): name prefix
+
+    Returns:
+        DataFrame : table with date index
+    """
+    import pandas as pd
+    objects = list(arrays[prefix + '__objects'])
+    columns = {}
+    for i in arrays[prefix + '__columns']:
+        values = arrays[prefix + '_' + i]
+        columns[i] = values.astype(object) if i in objects else values
+    frame = pd.DataFrame(columns, index=pd.DatetimeIndex(arrays[prefix + '__index']))
+    frame.index.name = 'date'
+    return frame
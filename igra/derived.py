@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+
+__all__ = ['svp', 'dewpoint', 'humidity', 'wind_to_uv', 'uv_to_wind', 'components', 'hypsometric']
+
+# saturation vapor pressure over water, Magnus form: a * exp(b * (T - T0) / (T - c)) [Pa]
+_svp = {'bolton': (611.2, 17.67, 273.15, 29.65),  # Bolton (1980)
+        'magnus': (610.94, 17.625, 273.15, 30.11),  # Alduchov and Eskridge (1996)
+        'foeewmo': (611.21, 17.502, 273.16, 32.19)}  # ECMWF IFS (Buck 1981)
+
+# derived variables and the columns they need
+_humidity = {'dewp': ['temp', 'dpd', 'rhumi'],
+             'vp': ['temp', 'dpd', 'rhumi'],
+             'shumi': ['pres', 'temp', 'dpd', 'rhumi'],
+             'rhumi': ['temp', 'dpd'],
+             'dpd': ['temp', 'rhumi']}
+_wind = {'u': ['windd', 'winds'],
+         'v': ['windd', 'winds']}
+_variables = dict(_humidity, **_wind)
+
+_rd = 287.05  # gas constant of dry air [J/kg/K]
+_g = 9.80665  # standard gravity [m/s2], gph is geopotential / g
+
+
+def svp(temp, method='bolton'):
+    """ Saturation vapor pressure over water
+
+    Args:
+        temp (ndarray): temperature [K]
+        method (str): bolton, magnus or foeewmo
+
+    Returns:
+        ndarray : saturation vapor pressure [Pa]
+    """
+    import numpy as np
+    a, b, t0, c = _parameters(method)
+    return a * np.exp(b * (temp - t0) / (temp - c))
+
+
+def dewpoint(vp, method='bolton'):
+    """ Dewpoint temperature, inverse of svp
+
+    Args:
+        vp (ndarray): vapor pressure [Pa]
+        method (str): bolton, magnus or foeewmo
+
+    Returns:
+        ndarray : dewpoint temperature [K], NaN for vp <= 0
+    """
+    import numpy as np
+    a, b, t0, c = _parameters(method)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = np.log(np.where(vp > 0, vp, np.nan) / a)
+    return (b * t0 - c * x) / (b - x)
+
+
+def humidity(data, variables=None, method='bolton', **kwargs):
+    """ Derive humidity variables for all levels of a table of soundings at once
+
+    The dewpoint is taken from the dewpoint depression, or from the relative humidity if
+    dpd is missing. Derived values are in the units of the table (see ascii_to_dataframe):
+    dewp [C] like temp, vp [Pa], shumi [kg/kg], rhumi [%] and dpd [K]. Existing rhumi and
+    dpd values are kept, only missing ones are filled.
+
+    Args:
+        data (DataFrame): Table of radiosonde soundings (pres, temp, rhumi, dpd)
+        variables (list): dewp, vp, shumi, rhumi, dpd (default all)
+        method (str): saturation vapor pressure formula, bolton, magnus or foeewmo
+        **kwargs:
+
+    Returns:
+        DataFrame : Table with derived columns
+    """
+    import numpy as np
+    from .support import message
+
+    if variables is None:
+        variables = list(_humidity.keys())
+    unknown = [i for i in variables if i not in _humidity]
+    if len(unknown) > 0:
+        raise ValueError("Unknown derived variables: %s (%s)" % (",".join(unknown), ",".join(_humidity.keys())))
+
+    nan = np.full(len(data), np.nan)
+    temp = data['temp'].values + 273.15 if 'temp' in data.columns else nan
+    dpd = data['dpd'].values if 'dpd' in data.columns else nan
+    rhumi = data['rhumi'].values if 'rhumi' in data.columns else nan
+    es = svp(temp, method=method)
+    with np.errstate(invalid='ignore'):
+        dewp = np.where(np.isfinite(dpd), temp - dpd, dewpoint(es * rhumi / 100., method=method))
+    vp = svp(dewp, method=method)
+
+    data = data.copy()
+    if 'rhumi' in variables:
+        data['rhumi'] = np.where(np.isfinite(rhumi), rhumi, 100. * vp / es)
+    if 'dpd' in variables:
+        data['dpd'] = np.where(np.isfinite(dpd), dpd, temp - dewp)
+    if 'dewp' in variables:
+        data['dewp'] = dewp - 273.15  # like temp
+    if 'vp' in variables:
+        data['vp'] = vp
+    if 'shumi' in variables:
+        pres = data['pres'].values if 'pres' in data.columns else nan
+        data['shumi'] = 0.622 * vp / (pres - 0.378 * vp)
+    message("Derived", ",".join(variables), "with", method, **kwargs)
+    return data
+
+
+def wind_to_uv(windd, winds):
+    """ Wind components from direction and speed
+
+    Args:
+        windd (ndarray): direction the wind is coming from [degree]
+        winds (ndarray): speed [m/s]
+
+    Returns:
+        ndarray : eastward wind u [m/s]
+        ndarray : northward wind v [m/s]
+    """
+    import numpy as np
+    rad = np.radians(windd)
+    return -winds * np.sin(rad), -winds * np.cos(rad)
+
+
+def uv_to_wind(u, v):
+    """ Wind direction and speed from components, inverse of wind_to_uv
+
+    Args:
+        u (ndarray): eastward wind [m/s]
+        v (ndarray): northward wind [m/s]
+
+    Returns:
+        ndarray : direction the wind is coming from [degree], 0 to 360
+        ndarray : speed [m/s]
+    """
+    import numpy as np
+    return np.degrees(np.arctan2(-u, -v)) % 360., np.hypot(u, v)
+
+
+def components(data, **kwargs):
+    """ Add wind components u, v to a table of soundings (all levels at once)
+
+    Components are interpolated like any other variable, while the direction can not
+    be interpolated linearly across north. Use uv_to_wind after the interpolation.
+
+    Args:
+        data (DataFrame): Table of radiosonde soundings (windd, winds)
+        **kwargs:
+
+    Returns:
+        DataFrame : Table with u and v columns
+    """
+    from .support import message
+
+    data = data.copy()
+    data['u'], data['v'] = wind_to_uv(data['windd'].values, data['winds'].values)
+    message("Derived u,v", **kwargs)
+    return data
+
+
+def hypsometric(data, **kwargs):
+    """ Fill missing pressure from geopotential height and missing height from pressure
+
+    The hypsometric equation is integrated along every sounding (trapezoidal rule) from
+    the nearest level below (or above) with both pressure and height. Temperatures are
+    interpolated between reported temperatures of the sounding, the standard atmosphere is
+    used for soundings without temperature (e.g. pilot balloons). All soundings are
+    filled at once.
+
+    flag_hyps: 0 reported, 1 pres from gph, 2 gph from pres, +4 standard atmosphere
+
+    Args:
+        data (DataFrame): Table of radiosonde soundings (pres [Pa], gph [m], temp [C])
+        **kwargs:
+
+    Returns:
+        DataFrame : Table with filled pres, gph and flag_hyps
+    """
+    import numpy as np
+    from .support import message
+
+    dates, seg = np.unique(data.index.values, return_inverse=True)
+    pres = data['pres'].values.astype(float)
+    gph = data['gph'].values.astype(float) if 'gph' in data.columns else np.full(pres.size, np.nan)
+    temp = data['temp'].values + 273.15 if 'temp' in data.columns else np.full(pres.size, np.nan)
+    flag = np.zeros(pres.size, dtype=np.int64)
+    #
+    # pressure from height: ln p = ln p0 - g / Rd * integral dz / T
+    #
+    rows = np.flatnonzero(np.isfinite(gph))
+    rows = rows[np.lexsort((gph[rows], seg[rows]))]
+    tz, std = _along(temp[rows], gph[rows], seg[rows])
+    tz = np.where(std, np.maximum(288.15 - 0.0065 * gph[rows], 216.65), tz)
+    anchor = _anchor(np.isfinite(pres[rows]), seg[rows])
+    fill = np.isnan(pres[rows]) & (anchor >= 0)
+    integral = _cumtrapz(1. / tz, gph[rows], seg[rows])
+    with np.errstate(invalid='ignore'):
+        new = pres[rows][anchor] * np.exp(-_g / _rd * (integral - integral[anchor]))
+    pres_new = pres.copy()
+    pres_new[rows[fill]] = new[fill]
+    flag[rows[fill]] = 1 + 4 * std[fill]
+    #
+    # height from pressure: z = z0 + Rd / g * integral T dln(1/p)
+    #
+    rows = np.flatnonzero(np.isfinite(pres))
+    rows = rows[np.lexsort((-pres[rows], seg[rows]))]
+    x = -np.log(pres[rows])
+    tp, std = _along(temp[rows], x, seg[rows])
+    tp = np.where(std, np.maximum(288.15 * (pres[rows] / 101325.) ** (0.0065 * _rd / _g), 216.65), tp)
+    anchor = _anchor(np.isfinite(gph[rows]), seg[rows])
+    fill = np.isnan(gph[rows]) & (anchor >= 0)
+    integral = _cumtrapz(tp, x, seg[rows])
+    new = gph[rows][anchor] + _rd / _g * (integral - integral[anchor])
+    gph_new = gph.copy()
+    gph_new[rows[fill]] = new[fill]
+    flag[rows[fill]] = 2 + 4 * std[fill]
+
+    message("Filled pres:", (flag & 1).astype(bool).sum(), "gph:", (flag & 2).astype(bool).sum(), **kwargs)
+    data = data.copy()
+    data['pres'] = pres_new
+    data['gph'] = gph_new
+    data['flag_hyps'] = flag
+    return data
+
+
+def _along(values, x, seg):
+    """ Interpolate missing values linearly in x within each segment (sorted by seg, x)
+
+    Returns:
+        ndarray : values, constant beyond the first / last valid value
+        ndarray : segment without any valid value
+    """
+    import numpy as np
+    valid = np.isfinite(values)
+    before = _anchor(valid, seg, above=False)
+    after = _anchor(valid, seg, below=False)
+    i0 = np.where(before >= 0, before, after)
+    i1 = np.where(after >= 0, after, before)
+    none = i0 < 0
+    i0, i1 = np.maximum(i0, 0), np.maximum(i1, 0)
+    if values.size == 0:
+        return values, none
+    dx = x[i1] - x[i0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        w = np.where(dx > 0, (x - x[i0]) / dx, 0.)
+    return values[i0] + w * (values[i1] - values[i0]), none
+
+
+def _anchor(valid, seg, below=True, above=True):
+    """ Position of the nearest valid value before (else after) in the same segment
+
+    Args:
+        valid (ndarray): valid values, sorted by segment
+        seg (ndarray): segment of each value
+        below (bool): search before
+        above (bool): search after, if nothing was found before
+
+    Returns:
+        ndarray : position or -1
+    """
+    import numpy as np
+    n = valid.size
+    out = np.full(n, -1)
+    if n == 0:
+        return out
+    if below:
+        prev = np.maximum.accumulate(np.where(valid, np.arange(n), -1))
+        ok = prev >= 0
+        ok[ok] = seg[prev[ok]] == seg[ok]
+        out[ok] = prev[ok]
+    if above:
+        nxt = np.minimum.accumulate(np.where(valid, np.arange(n), n)[::-1])[::-1]
+        ok = (out < 0) & (nxt < n)
+        ok[ok] = seg[nxt[ok]] == seg[ok]
+        out[ok] = nxt[ok]
+    return out
+
+
+def _cumtrapz(values, x, seg):
+    """ Cumulative trapezoidal integral along x, restarted in every segment (sorted by seg, x)
+
+    Summed level by level for all segments at once, the same for any number of segments.
+    """
+    import numpy as np
+    out = np.zeros(values.size)
+    if values.size < 2:
+        return out
+    step = 0.5 * (values[1:] + values[:-1]) * (x[1:] - x[:-1])
+    start = np.ones(values.size, dtype=bool)
+    start[1:] = seg[1:] != seg[:-1]
+    first = np.flatnonzero(start)
+    pos = np.arange(values.size) - np.repeat(first, np.diff(np.append(first, values.size)))
+    order = np.argsort(pos, kind='stable')
+    bounds = np.searchsorted(pos[order], np.arange(pos.max() + 2))
+    for i, j in zip(bounds[1:-1], bounds[2:]):
+        rows = order[i:j]
+        out[rows] = out[rows - 1] + step[rows - 1]
+    return out
+
+
+def _parameters(method):
+    """ Parameters of a saturation vapor pressure formula (see _svp) """
+    if method not in _svp:
+        raise ValueError("Unknown saturation formula: %s (%s)" % (method, ",".join(_svp.keys())))
+    return _svp[method]
@@ -1,26 +1,33 @@
-__all__ = ['station', 'update', 'stationlist', 'metadata']
+__all__ = ['station', 'stations', 'update', 'stationlist', 'metadata']
 
+default_server = 'https://www1.ncdc.noaa.gov/pub/data/igra/data/data-por/'
 
-def station(ident, directory, server=None, verbose=1):
+
+def station(ident, directory, server=None, force=False, verbose=1):
     """ Download IGRAv2 Station from NOAA
 
     Args:
         ident (str): IGRA ID
         directory (str): output directory
         server (str): download url
+        force (bool): download even if the file did not change on the server
         verbose (int): verboseness
 
     """
-    import urllib
     import os
     from .support import message
     os.makedirs(directory, exist_ok=True)
     if server is None:
-        server = 'https://www1.ncdc.noaa.gov/pub/data/igra/data/data-por/'
+        server = default_server
     url = "%s/%s-data.txt.zip" % (server, ident)
     message(url, ' to ', directory + '/%s-data.txt.zip' % ident, verbose=verbose)
 
-    urllib.request.urlretrieve(url, directory + '/%s-data.txt.zip' % ident)
+    manifest = _read_manifest(directory)
+    with _session() as session:
+        if not _fetch(session, url, directory + '/%s-data.txt.zip' % ident, manifest=manifest, force=force):
+            message("Not modified: ", directory + '/%s-data.txt.zip' % ident, verbose=verbose)
+            return
+    _write_manifest(directory, manifest)
 
     if os.path.isfile(directory + '/%s-data.txt.zip' % ident):
         message("Downloaded: ", directory + '/%s-data.txt.zip' % ident, verbose=verbose)
@@ -28,6 +35,280 @@ def station(ident, directory, server=None, verbose=1):
         message("File not found: ", directory + '/%s-data.txt.zip' % ident, verbose=verbose)
 
 
+def stations(idents, directory, server=None, workers=8, retries=3, backoff=1., timeout=60, force=False, verbose=1):
+    """ Download many IGRAv2 Stations from NOAA in parallel
+
+    Files are downloaded by a pool of threads, each with its own keep-alive session,
+    written to IDENT-data.txt.zip.part and renamed when complete. Failed requests are
+    retried with exponential backoff and a partial file is resumed with a HTTP Range
+    request, if it is still the same file on the server (If-Range).
+    Files that did not change on the server since the last download (manifest in
+    directory) are skipped.
+
+    Args:
+        idents (list, DataFrame): IGRA IDs, station list (index) or None for all stations in the list
+        directory (str): output directory
+        server (str): download url
+        workers (int): number of parallel downloads
+        retries (int): number of retries per file
+        backoff (float): seconds to wait before the first retry, doubled for every retry
+        timeout (float): seconds to wait for the server
+        force (bool): download even if files did not change on the server
+        verbose (int): verboseness
+
+    Returns:
+        dict : filenames by station
+        dict : error messages by station
+    """
+    import os
+    import threading
+    import pandas as pd
+    from concurrent.futures import ThreadPoolExecutor
+    from .support import message
+
+    os.makedirs(directory, exist_ok=True)
+    if server is None:
+        server = default_server
+    if idents is None:
+        idents = stationlist(directory, verbose=verbose)
+    if isinstance(idents, pd.DataFrame):
+        idents = list(idents.index)  # station list
+    if isinstance(idents, str):
+        idents = [idents]
+
+    manifest = _read_manifest(directory)
+    local = threading.local()  # Session is not thread-safe
+    sessions = []
+
+    def job(ident):
+        if not hasattr(local, 'session'):
+            local.session = _session()
+            sessions.append(local.session)
+        url = "%s/%s-data.txt.zip" % (server, ident)
+        filename = directory + '/%s-data.txt.zip' % ident
+        changed = _fetch(local.session, url, filename, retries=retries, backoff=backoff, timeout=timeout,
+                         manifest=manifest, force=force)
+        message("Downloaded: " if changed else "Not modified: ", filename, verbose=verbose)
+        return filename, changed
+
+    files, errors, nchanged = {}, {}, 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            futures = {ident: pool.submit(job, ident) for ident in idents}
+            for ident, future in futures.items():
+                try:
+                    files[ident], changed = future.result()
+                    nchanged += changed
+                except Exception as e:
+                    errors[ident] = repr(e)
+                    message("Error: ", ident, repr(e), verbose=verbose)
+    finally:
+        for isession in sessions:
+            isession.close()
+
+    _write_manifest(directory, manifest)
+    message("Stations downloaded:", nchanged, "Not modified:", len(files) - nchanged, "Errors:", len(errors),
+            verbose=verbose)
+    return files, errors
+
+
+def _session():
+    """ HTTP session with a keep-alive connection, one per thread
+
+    Returns:
+        Session
+    """
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _fetch(session, url, filename, retries=3, backoff=1., timeout=60, chunk_size=65536, manifest=None, force=False):
+    """ Download a file atomically, with retries and resume of partial files
+
+    With a manifest, a file that exists is only downloaded again if it changed on the
+    server (If-None-Match / If-Modified-Since, or the size of a HEAD request). A partial
+    file is resumed only with the validator (ETag or Last-Modified) of its first response
+    (If-Range, filename.part.json), otherwise it is downloaded again.
+
+    Args:
+        session (Session): HTTP session
+        url (str): file url
+        filename (str): output filename, filename.part while downloading
+        retries (int): number of retries
+        backoff (float): seconds to wait before the first retry, doubled for every retry
+        timeout (float): seconds to wait for the server
+        chunk_size (int): bytes to write at once
+        manifest (dict): ETag, Last-Modified and size of downloaded files, updated
+        force (bool): download even if the file did not change (no conditional request)
+
+    Returns:
+        bool : downloaded or not modified
+    """
+    import os
+    import time
+    import requests
+
+    part = filename + '.part'
+    validator = part + '.json'
+    entry = None
+    if manifest is not None and os.path.isfile(filename) and not force:
+        entry = manifest.get(os.path.basename(filename))
+        if entry is not None and entry.get('size') != os.path.getsize(filename):
+            entry = None  # changed locally
+    for attempt in range(retries + 1):
+        try:
+            size = os.path.getsize(part) if os.path.isfile(part) else 0
+            if_range = _read_validator(validator) if size > 0 else None
+            headers = {'Accept-Encoding': 'identity'}  # bytes as on the server
+            if if_range is not None:
+                headers['Range'] = 'bytes=%d-' % size
+                headers['If-Range'] = if_range
+            elif entry is not None:
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
+                if 'If-None-Match' not in headers and 'If-Modified-Since' not in headers:
+                    head = session.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+                    if head.ok and head.headers.get('Content-Length') == str(entry['size']):
+                        return False
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as req:
+                if req.status_code == 304:
+                    return False
+                if req.status_code == 416:
+                    _remove(part, validator)  # partial file does not fit, start again
+                    raise IOError("Range not satisfiable: %s" % url)
+                if req.status_code >= 500 or req.status_code == 429:
+                    raise IOError("Server error %d: %s" % (req.status_code, url))
+                req.raise_for_status()  # other errors are not retried
+                resume = req.status_code == 206
+                if resume and (if_range is None or _range_start(req.headers.get('Content-Range')) != size):
+                    _remove(part, validator)
+                    raise IOError("Content-Range does not continue the partial file: %s" % url)
+                if not resume:
+                    _write_validator(validator, req.headers)  # before any byte of a new file
+                expected = req.headers.get('Content-Length')
+                received = 0
+                with open(part, 'ab' if resume else 'wb') as outfile:
+                    for chunk in req.iter_content(chunk_size=chunk_size):
+                        outfile.write(chunk)
+                        received += len(chunk)
+                if expected is not None and received != int(expected):
+                    raise IOError("Incomplete download (%d of %s bytes): %s" % (received, expected, url))
+            os.replace(part, filename)
+            _remove(validator)
+            if manifest is not None:
+                manifest[os.path.basename(filename)] = {'url': url, 'etag': req.headers.get('ETag'),
+                                                        'last_modified': req.headers.get('Last-Modified'),
+                                                        'size': os.path.getsize(filename)}
+            return True
+        except requests.HTTPError:
+            raise
+        except (IOError, requests.RequestException):
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def _read_validator(filename):
+    """ If-Range validator of a partial download
+
+    Args:
+        filename (str): validator file (filename.part.json)
+
+    Returns:
+        str : ETag, Last-Modified or None
+    """
+    import os
+    import json
+    if not os.path.isfile(filename):
+        return None
+    try:
+        with open(filename) as infile:
+            info = json.load(infile)
+    except ValueError:
+        return None
+    return info.get('etag') or info.get('last_modified')
+
+
+def _write_validator(filename, headers):
+    """ Store the If-Range validator of a new download (strong ETag or Last-Modified)
+
+    Args:
+        filename (str): validator file (filename.part.json)
+        headers (dict): response headers
+    """
+    import json
+    etag = headers.get('ETag')
+    if etag is not None and etag.startswith('W/'):
+        etag = None  # weak, not allowed in If-Range
+    with open(filename, 'w') as outfile:
+        json.dump({'etag': etag, 'last_modified': headers.get('Last-Modified')}, outfile)
+
+
+def _range_start(content_range):
+    """ First byte of a Content-Range header (bytes 100-199/200)
+
+    Args:
+        content_range (str): header value
+
+    Returns:
+        int : first byte or None
+    """
+    try:
+        return int(content_range.split()[1].split('-')[0])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _remove(*filenames):
+    """ Remove files, if they exist """
+    import os
+    for ifile in filenames:
+        if os.path.isfile(ifile):
+            os.remove(ifile)
+
+
+def _read_manifest(directory):
+    """ Read the download manifest of a directory
+
+    Args:
+        directory (str): download directory
+
+    Returns:
+        dict : ETag, Last-Modified, size and url by filename
+    """
+    import os
+    import json
+    filename = os.path.join(directory, 'igra-manifest.json')
+    if not os.path.isfile(filename):
+        return {}
+    try:
+        with open(filename) as infile:
+            return json.load(infile)
+    except ValueError:
+        return {}  # broken, download again
+
+
+def _write_manifest(directory, manifest):
+    """ Write the download manifest of a directory atomically
+
+    Args:
+        directory (str): download directory
+        manifest (dict): ETag, Last-Modified, size and url by filename
+    """
+    import os
+    import json
+    filename = os.path.join(directory, 'igra-manifest.json')
+    with open(filename + '.tmp', 'w') as outfile:
+        json.dump(manifest, outfile, indent=1, sort_keys=True)
+    os.replace(filename + '.tmp', filename)
+
+
 def update(ident, directory, year='2018', verbose=1):
     """ Download an update from the IGRAv2 archive (data-2yd)
     Usually there is an updated file from the running year(e.g. 2019, then 2018 should be given)
@@ -39,13 +320,13 @@ def update(ident, directory, year='2018', verbose=1):
         verbose (int): verbosness
 
     """
-    import urllib
     import os
     from .support import message
     os.makedirs(directory, exist_ok=True)
     url = "https://www1.ncdc.noaa.gov/pub/data/igra/data/data-y2d/%s-data-beg%s.txt.zip" % (ident, year)
     message(url, ' to ', directory + '/%s-data-beg%s.txt.zip' % (ident, year), verbose=verbose)
-    urllib.request.urlretrieve(url, directory + '/%s-data-beg%s.txt.zip' % (ident, year))
+    with _session() as session:
+        _fetch(session, url, directory + '/%s-data-beg%s.txt.zip' % (ident, year))
 
     if os.path.isfile(directory + '/%s-data-beg%s.txt.zip' % (ident, year)):
         message("Downloaded: ", directory + '/%s-data-beg%s.txt.zip' % (ident, year), verbose=verbose)
@@ -53,23 +334,31 @@ def update(ident, directory, year='2018', verbose=1):
         message("File not found: ", directory + '/%s-data-beg%s.txt.zip' % (ident, year), verbose=verbose)
 
 
-def stationlist(directory, verbose=1):
+def stationlist(directory, server=None, force=False, verbose=1):
     """ Download the IGRAv2 station list
 
     Args:
         directory (str): save directory for the raw list
+        server (str): download url
+        force (bool): download even if the list did not change on the server
         verbose (int): verbosness
 
     Returns:
         DataFrame : station informations
     """
-    import urllib
     import os
     from .support import message
     from .read import stationlist as read_list
     os.makedirs(directory, exist_ok=True)
-    urllib.request.urlretrieve("https://www1.ncdc.noaa.gov/pub/data/igra/igra2-station-list.txt",
-                               filename=directory + '/igra2-station-list.txt')
+    if server is None:
+        server = "https://www1.ncdc.noaa.gov/pub/data/igra"
+    manifest = _read_manifest(directory)
+    with _session() as session:
+        if _fetch(session, server + '/igra2-station-list.txt', directory + '/igra2-station-list.txt',
+                  manifest=manifest, force=force):
+            _write_manifest(directory, manifest)
+        else:
+            message("Not modified: ", directory + '/igra2-station-list.txt', verbose=verbose)
 
     if os.path.isfile(directory + '/igra2-station-list.txt'):
         message("Download complete, reading table ...", verbose=verbose)
@@ -78,20 +367,28 @@ def stationlist(directory, verbose=1):
         message("File not found: ", directory + '/igra2-station-list.txt', verbose=verbose)
 
 
-def metadata(directory, verbose=1):
+def metadata(directory, server=None, force=False, verbose=1):
     """ Download IGRAv2 meta information on radiosonde changes
 
     Args:
         directory (str): save directory
+        server (str): download url
+        force (bool): download even if the file did not change on the server
         verbose (int): verboseness
 
     """
-    import urllib
     import os
     from .support import message
     os.makedirs(directory, exist_ok=True)
-    urllib.request.urlretrieve("https://www1.ncdc.noaa.gov/pub/data/igra/history/igra2-metadata.txt",
-                               filename=directory + '/igra2-metadata.txt')
+    if server is None:
+        server = "https://www1.ncdc.noaa.gov/pub/data/igra/history"
+    manifest = _read_manifest(directory)
+    with _session() as session:
+        if not _fetch(session, server + '/igra2-metadata.txt', directory + '/igra2-metadata.txt',
+                      manifest=manifest, force=force):
+            message("Not modified: ", directory + '/igra2-metadata.txt', verbose=verbose)
+            return
+    _write_manifest(directory, manifest)
 
     if not os.path.isfile(directory + '/igra2-metadata.txt'):
         message("File not found: ", directory + '/igra2-metadata.txt', verbose=verbose)
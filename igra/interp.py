@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 
+from functools import lru_cache
 
 __all__ = ['dataframe']
 
 
-def dataframe(data, level_column, levels=None, variables=None, keep_old_levels=True, **kwargs):
+def dataframe(data, level_column, levels=None, variables=None, keep_old_levels=True, engine='numpy', only_levels=False,
+              log=True, **kwargs):
     """ Interpolate a database DataFrame according to pressure levels in level_column
 
     Interpolate:
@@ -19,10 +21,14 @@ def dataframe(data, level_column, levels=None, variables=None, keep_old_levels=T
         levels (list, ndarray):  new pressure levels for interpolation
         variables (list): Variables to interpolate
         keep_old_levels (bool) : keep old levels in database ?
+        engine (str): numpy (all soundings at once) or python (per sounding with table)
+        only_levels (bool): return only rows on new levels, others are not interpolated (numpy)
+        log (bool): interpolate in log(level_column) (pressure) or linear (e.g. geopotential height)
 
     Returns:
     DataFrame : interpolated DataFrame with new pressure levels
     """
+    import numpy as np
     import pandas as pd
     from . import std_plevels
     from .support import message
@@ -46,25 +52,279 @@ def dataframe(data, level_column, levels=None, variables=None, keep_old_levels=T
 
     # Interpolate
     n = data.shape
-    data = data.groupby('date').apply(table, level_column, levels)
+    if engine == 'numpy' and np.isfinite(data[level_column].values).all():
+        data = ragged(data, level_column, levels, only_levels=only_levels, log=log)
+    elif engine in ('numpy', 'python'):
+        data = data.groupby('date').apply(table, level_column, levels, log=log)
+        # Change multi-index
+        data = data.reset_index().drop('level_1', axis=1).sort_values(by=['date', level_column]).set_index('date',
+                                                                                                           drop=True)
+        if only_levels:
+            data = data[data[level_column].isin(levels)]
+    else:
+        raise ValueError("Unknown engine: %s (numpy, python)" % engine)
+
     if not keep_old_levels:
         data = data.drop('flag_int', axis=1)
-
-    # Change multi-index
-    data = data.reset_index().drop('level_1', axis=1).sort_values(by=['date', level_column]).set_index('date',
-                                                                                                       drop=True)
     m = data.shape
     message(n, ' >> ', m, **kwargs)
     return data
 
 
-def table(data, level_column, levels):
+def ragged(data, level_column, levels, only_levels=False, log=True):
+    """ Interpolate all soundings of a DataFrame at once, same results as table per date
+
+    Rows are sorted by (date, level) into segments. Soundings that have all levels are
+    passed on unchanged, all others are interpolated in log-pressure to the union of
+    their levels and the new levels, for every column with one search over all segments.
+    With only_levels, soundings that report all new levels once are selected directly,
+    only the others are sorted and interpolated.
+
+    Args:
+        data (DataFrame): Input DataFrame with date index and numeric columns
+        level_column (str): pressure level column
+        levels (ndarray or list): new pressure levels
+        only_levels (bool): return and interpolate only rows on new levels
+        log (bool): interpolate in log-pressure or linear in the levels
+
+    Returns:
+    DataFrame : new DataFrame with flag_int, sorted by date and level
+    """
+    import numpy as np
+    import pandas as pd
+
+    levels = np.asarray(levels)
+    dates, iseg = np.unique(data.index.values, return_inverse=True)
+    pin = data[level_column].values
+    subset = np.arange(pin.size)
+    direct = {i: np.zeros(0, dtype=data[i].dtype) for i in data.columns}
+    dseg = np.zeros(0, dtype=int)
+    if only_levels:
+        # complete soundings without duplicate levels are selected directly
+        complete, rows = _reported(iseg, pin, levels, dates.size)
+        if complete.any():
+            direct = {i: data[i].values[rows] for i in data.columns}
+            dseg = iseg[rows]
+            subset = np.flatnonzero(~complete[iseg])
+            iseg, pin = iseg[subset], pin[subset]
+    order = np.lexsort((pin, iseg))
+    seg = iseg[order]
+    plev = pin[order]
+    #
+    # Duplicate levels, same order as sort_values per date (table)
+    #
+    dup = (seg[1:] == seg[:-1]) & (plev[1:] == plev[:-1])
+    if dup.any():
+        bounds = np.searchsorted(seg, np.arange(dates.size + 1))
+        byseg = np.argsort(iseg, kind='stable')
+        for i in np.unique(seg[1:][dup]):
+            rows = byseg[bounds[i]:bounds[i + 1]]
+            order[bounds[i]:bounds[i + 1]] = rows[np.argsort(pin[rows], kind='quicksort')]
+        plev = pin[order]
+    columns = {i: data[i].values[subset[order]] for i in data.columns}
+    #
+    # Are there levels missing?
+    #
+    onlev = np.isin(plev, levels)
+    complete = np.bincount(seg, weights=onlev, minlength=dates.size) == np.size(levels)
+    iold = complete[seg]
+    if iold.all():
+        if only_levels:
+            seg = seg[onlev]
+            columns = {i: j[onlev] for i, j in columns.items()}
+        columns['flag_int'] = np.zeros(seg.size, dtype=np.int64)
+        if dseg.size > 0:
+            direct['flag_int'] = np.zeros(dseg.size, dtype=np.int64)
+            ix = np.argsort(np.concatenate([dseg, seg]), kind='stable')
+            columns = {i: np.concatenate([direct[i], j])[ix] for i, j in columns.items()}
+            seg = np.concatenate([dseg, seg])[ix]
+        out = pd.DataFrame(columns, index=pd.DatetimeIndex(dates[seg], name='date'))
+        return out
+    #
+    # combine all levels (new levels, flag_int = 1)
+    #
+    inew = np.flatnonzero(~iold)
+    if only_levels:
+        iold &= onlev
+    newseg = np.unique(seg[inew])
+    tseg = np.concatenate([seg[inew], np.repeat(newseg, np.size(levels))])
+    tlev = np.concatenate([plev[inew], np.tile(levels, newseg.size)]).astype(float)
+    tflag = np.concatenate([np.zeros(inew.size), np.ones(newseg.size * np.size(levels))])
+    ix = np.lexsort((tflag, tlev, tseg))
+    tseg, tlev, tflag = tseg[ix], tlev[ix], tflag[ix]
+    first = np.ones(tseg.size, dtype=bool)
+    first[1:] = (tseg[1:] != tseg[:-1]) | (tlev[1:] != tlev[:-1])
+    if only_levels:
+        first &= np.isin(tlev, levels)
+    tseg, tlev, tflag = tseg[first], tlev[first], tflag[first]
+    #
+    # one ordering of old and new levels for all columns
+    #
+    nseg, nlev = seg[inew], plev[inew]
+    kind = np.concatenate([np.zeros(inew.size, dtype=bool), np.ones(tseg.size, dtype=bool)])
+    ix = np.lexsort((kind, np.concatenate([nlev, tlev]), np.concatenate([nseg, tseg])))
+    isold = ~kind[ix]
+    tx = np.log(tlev) if log else tlev
+    #
+    # Iterate columns
+    #
+    weights = []  # same valid values, same weights (e.g. windd, winds)
+    for ivar, values in columns.items():
+        if ivar == level_column:
+            inter = tlev
+        else:
+            inter = _segments(values[inew], nseg, nlev, tseg, tx, ix, isold, dates.size, weights=weights, log=log)
+        columns[ivar] = np.concatenate([inter, values[iold].astype(float), direct[ivar].astype(float)])
+    #
+    # Fill in interpolation flag, sort by date (stable)
+    #
+    columns['flag_int'] = np.concatenate([tflag, np.zeros(iold.sum() + dseg.size)])
+    oseg = np.concatenate([tseg, seg[iold], dseg])
+    ix = np.argsort(oseg, kind='stable')
+    out = pd.DataFrame({i: j[ix] for i, j in columns.items()}, index=pd.DatetimeIndex(dates[oseg[ix]], name='date'))
+    return out
+
+
+@lru_cache(maxsize=8)
+def _cached_levels(levels):
+    """ Sorted unique levels (read only) of a tuple of levels, see _levels
+    """
+    import numpy as np
+    levels = np.unique(np.asarray(levels, dtype=float))
+    levels.setflags(write=False)
+    return levels
+
+
+def _levels(levels):
+    """ Sorted unique levels as array, cached for repeated level sets (std_plevels, era_plevels)
+
+    Args:
+        levels (ndarray or list): pressure levels
+
+    Returns:
+        ndarray : sorted unique levels (read only)
+    """
+    import numpy as np
+    return _cached_levels(tuple(np.ravel(levels).tolist()))
+
+
+def _reported(seg, plev, levels, nsegs):
+    """ Segments that report every new level exactly once, no interpolation required
+
+    Args:
+        seg (ndarray): segment of rows
+        plev (ndarray): pressure levels of rows
+        levels (ndarray): new pressure levels
+        nsegs (int): number of segments
+
+    Returns:
+        ndarray : segment is complete (nsegs)
+        ndarray : rows on new levels of complete segments, sorted by segment and level
+    """
+    import numpy as np
+    ulevels = _levels(levels)
+    ilev = np.searchsorted(ulevels, plev)
+    ilev[ilev == ulevels.size] = 0
+    onlev = ulevels[ilev] == plev
+    # same rule as table (number of rows on new levels), but without duplicate levels
+    complete = np.bincount(seg[onlev], minlength=nsegs) == np.size(levels)
+    if not complete.any():
+        return complete, np.zeros(0, dtype=int)
+    rows = np.flatnonzero(onlev & complete[seg])
+    key = seg[rows] * ulevels.size + ilev[rows]
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+    dup = key[1:] == key[:-1]
+    complete[seg[rows[order[1:][dup]]]] = False
+    rows = rows[order]
+    return complete, rows[complete[seg[rows]]]
+
+
+def _segments(values, seg, plev, tseg, tx, order, isold, nsegs, weights=None, log=True):
+    """ np.interp (log-pressure) in every segment, see profile
+
+    Args:
+        values (ndarray): data sorted by segment and level
+        seg (ndarray): segment of values
+        plev (ndarray): pressure levels of values
+        tseg (ndarray): segment of new levels
+        tx (ndarray): log of new levels (levels without log)
+        order (ndarray): sorting of old and new levels by segment, level, old before new
+        isold (ndarray): old level in order
+        nsegs (int): number of segments
+        weights (list): (valid, weights) of previous columns, reused for the same valid values
+        log (bool): log-pressure or linear levels
+
+    Returns:
+        ndarray : interpolated values at new levels
+    """
+    import numpy as np
+    values = values.astype(float)
+    ix = np.isfinite(values)
+    out = np.full(tx.size, np.nan)
+    if not ix.any():
+        return out
+    w = None
+    for valid, iw in (weights or []):
+        if np.array_equal(valid, ix):
+            w = iw
+            break
+    if w is None:
+        w = _weights(ix, seg, plev, tseg, tx, order, isold, nsegs, log=log)
+        if weights is not None:
+            weights.append((ix, w))
+    exact, jexact, between, j0, j1, dxp, dtx = w
+    out[exact] = values[jexact]
+    slope = (values[j1] - values[j0]) / dxp
+    out[between] = slope * dtx + values[j0]
+    return out
+
+
+def _weights(valid, seg, plev, tseg, tx, order, isold, nsegs, log=True):
+    """ Bracketing rows and log-pressure distances of new levels for valid values, see _segments
+
+    Returns:
+        ndarray : new levels on a valid level
+        ndarray : rows of these
+        ndarray : new levels between valid levels
+        ndarray : rows below
+        ndarray : rows above
+        ndarray : log-pressure distance of rows above and below
+        ndarray : log-pressure distance of new levels to rows below
+    """
+    import numpy as np
+    # enough data left ?
+    enough = np.bincount(seg[valid], minlength=nsegs) > 2
+    # unique levels (first)
+    idx = np.flatnonzero(valid)
+    first = np.ones(idx.size, dtype=bool)
+    first[1:] = (seg[idx[1:]] != seg[idx[:-1]]) | (plev[idx[1:]] != plev[idx[:-1]])
+    idx = idx[first]
+    nodes = np.zeros(valid.size, dtype=bool)
+    nodes[idx] = True
+    # last node below or at each new level
+    counts = np.zeros(order.size, dtype=np.int64)
+    counts[isold] = nodes
+    j = np.cumsum(counts)[~isold] - 1
+    xseg, xp = seg[idx], np.log(plev[idx]) if log else plev[idx]
+    j0 = np.maximum(j, 0)
+    j1 = np.minimum(j0 + 1, idx.size - 1)
+    inside = (j >= 0) & (xseg[j0] == tseg) & enough[tseg]
+    exact = inside & (xp[j0] == tx)
+    between = inside & ~exact & (j + 1 < idx.size) & (xseg[j1] == tseg)
+    jexact = idx[j0[exact]]
+    j0, j1 = j0[between], j1[between]
+    return exact, jexact, between, idx[j0], idx[j1], xp[j1] - xp[j0], tx[between] - xp[j0]
+
+
+def table(data, level_column, levels, log=True):
     """ Wrapper Function for _np_profile to handle a DataFrame
 
     Args:
         data (DataFrame): Input DataFrame for a timestamp
         level_column (str): pressure level column
         levels (ndarray or list): new pressure levels
+        log (bool): interpolate in log-pressure or linear in the levels
 
     Returns:
     DataFrame : new DataFrame with size of levels
@@ -73,15 +333,17 @@ def table(data, level_column, levels):
     import pandas as pd
     df = data.sort_values(level_column)
     pin = df[level_column].values
+    nlevels = np.size(levels)
+    levels = _levels(levels)
     #
     # Are there levels missing?
     #
-    if np.in1d(pin, levels).sum() != np.size(levels):
+    if np.in1d(pin, levels).sum() != nlevels:
         # df.drop(level_column, 1, inplace=True)   # slow
         #
         # Index of pressure
         #
-        j = int(np.where(df.columns == level_column)[0])
+        j = df.columns.get_loc(level_column)
         #
         # combine all levels
         #
@@ -89,12 +351,16 @@ def table(data, level_column, levels):
         #
         # Iterate columns
         #
+        # log-pressure nodes by valid values, shared by columns
+        values = df.values
+        logp = np.log(new_plevs) if log else new_plevs
+        nodes = {}
         data = np.full((new_plevs.size, df.shape[1] + 1), np.nan)
         for i in range(df.shape[1]):
             if i == j:
                 data[:, i] = new_plevs
             else:
-                data[:, i] = profile(df.values[:, i], pin, new_plevs)
+                data[:, i] = profile(values[:, i], pin, new_plevs, logp=logp, nodes=nodes, log=log)
         #
         # Fill in interpolation flag
         #
@@ -109,7 +375,7 @@ def table(data, level_column, levels):
     
 
 
-def profile(data, plevs, new_plevs):
+def profile(data, plevs, new_plevs, logp=None, nodes=None, log=True):
     """ Modified np.interp Function for filtering NAN
 
     Args
@@ -120,6 +386,12 @@ def profile(data, plevs, new_plevs):
             Input pressure levels
         new_plevs : ndarray
             Output pressure levels
+        logp : ndarray
+            log of new_plevs (optional)
+        nodes : dict
+            log-pressure nodes by valid values, filled and reused for the same plevs (optional)
+        log : bool
+            interpolate in log-pressure or linear in the levels (e.g. geopotential height)
 
     Returns
     -------
@@ -133,13 +405,22 @@ def profile(data, plevs, new_plevs):
     if s > 2:
         # plevs, data = numpy.unique([plevs[ix], data[ix]], axis=1)   # slow 75%
         # Speed improvement
-        plevs, data = plevs[ix], data[ix]
-        plevs, ix = np.unique(plevs, return_index=True)
-        data = data[ix]
+        key = ix.tobytes()
+        if nodes is None or key not in nodes:
+            xp, iu = np.unique(plevs[ix], return_index=True)
+            if log:
+                xp = np.log(xp)
+            if nodes is not None:
+                nodes[key] = (xp, iu)
+        else:
+            xp, iu = nodes[key]
+        data = data[ix][iu]
         # End Improvement
         # todo add uncertainty from interpolation, due to spacing
         # summe der ableitung zum quadrat mal unsicherheit quadrat
-        data = np.interp(np.log(new_plevs), np.log(plevs), data, left=np.nan, right=np.nan)
+        if logp is None:
+            logp = np.log(new_plevs) if log else new_plevs
+        data = np.interp(logp, xp, data, left=np.nan, right=np.nan)
         return data
 
     return np.full_like(new_plevs, np.nan)  # Nothing to do, but keep shape
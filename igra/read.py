@@ -10,9 +10,17 @@ _metadata = {'temp': {'units': 'K', 'standard_name': 'air_temperature'},
              'alt': {'units': 'm', 'standard_name': 'altitude_above_sea_level'},
              'gph': {'units': 'm', 'standard_name': 'geopotential_height'},
              'pres': {'units': 'Pa', 'standard_name': 'air_pressure', 'axis': 'Z'},
-             'flag_int': {'units': '1', 'standard_name': 'flag_interpolation', 'info': '0: raw, 1: interpolated'}}
+             'flag_int': {'units': '1', 'standard_name': 'flag_interpolation', 'info': '0: raw, 1: interpolated'},
+             'dewp': {'units': 'K', 'standard_name': 'dew_point_temperature'},
+             'vp': {'units': 'Pa', 'standard_name': 'water_vapor_partial_pressure_in_air'},
+             'shumi': {'units': 'kg/kg', 'standard_name': 'specific_humidity'},
+             'u': {'units': 'm/s', 'standard_name': 'eastward_wind'},
+             'v': {'units': 'm/s', 'standard_name': 'northward_wind'},
+             'flag_hyps': {'units': '1', 'standard_name': 'flag_hypsometric',
+                           'info': '0: reported, 1: pres from gph, 2: gph from pres, +4: standard atmosphere'}}
 
-__all__ = ['igra', 'uadb', 'ascii_to_dataframe', 'metadata', 'stationlist', 'uadb_ascii_to_dataframe']
+__all__ = ['igra', 'uadb', 'igra_many', 'update', 'ascii_to_dataframe', 'ascii_to_compact', 'iter_ascii_to_dataframe',
+           'sounding_index', 'read_soundings', 'inventory', 'metadata', 'stationlist', 'uadb_ascii_to_dataframe']
 
 
 def igra(ident, filename, variables=None, levels=None, return_table=False, **kwargs):
@@ -24,23 +32,27 @@ def igra(ident, filename, variables=None, levels=None, return_table=False, **kwa
         variables (list): select only these variables
         levels (list): interpolate to these pressure levels [Pa]
         return_table (bool): return odb like datatable
-        **kwargs:
+        **kwargs: e.g. start, end (str, datetime) to read only soundings in this window,
+                  cache (str, bool) to keep parsed tables in a cache directory,
+                  duplicates (str) first, last, mean or raise for soundings with the same date
 
     Returns:
         Dataset : profiles
         Dataset : station information
     """
     import xarray as xr
+    if variables is not None and not isinstance(variables, list):
+        variables = [variables]
+
     if '.nc' in filename:
         data = xr.open_dataset(filename, **kwargs)
+        station = None
     else:
-        data, station = to_std_levels(ident, filename, levels=levels, return_table=return_table, **kwargs)
+        data, station = to_std_levels(ident, filename, levels=levels, return_table=return_table, variables=variables,
+                                      **kwargs)
 
     if variables is not None:
         avail = list(data.data_vars.keys())
-        if not isinstance(variables, list):
-            variables = [variables]
-
         variables = [iv for iv in variables if iv in avail]
         if len(variables) > 0:
             data = data[variables]  # subset
@@ -57,7 +69,7 @@ def uadb(ident, filename, variables=None, levels=None, return_table=False, **kwa
         variables (list): select only these variables
         levels (list): interpolate to these pressure levels [Pa]
         return_table (bool): return odb like datatable
-        **kwargs:
+        **kwargs: e.g. cache (str, bool) to keep parsed tables in a cache directory
 
     Returns:
         Dataset : profiles
@@ -67,6 +79,7 @@ def uadb(ident, filename, variables=None, levels=None, return_table=False, **kwa
 
     if '.nc' in filename:
         data = xr.open_dataset(filename, **kwargs)
+        station = None
     else:
         data, station = to_std_levels(ident, filename, levels=levels, uadb=True, return_table=return_table, **kwargs)
 
@@ -82,70 +95,285 @@ def uadb(ident, filename, variables=None, levels=None, return_table=False, **kwa
     return data, station
 
 
-def to_std_levels(ident, filename, levels=None, return_table=False, **kwargs):
+def igra_many(idents, directory, variables=None, levels=None, workers=None, concat=False, **kwargs):
+    """ Read and interpolate many IGRA (or UADB) stations in a pool of processes
+
+    Station files are looked up in directory (IDENT-data.txt.zip, .txt.gz, .txt or
+    uadb_trhc_WMO.txt with uadb=True). A failing station is reported in errors and
+    does not stop the others.
+
+    Args:
+        idents (list): IGRA IDs
+        directory (str): directory of station files
+        variables (list): select only these variables
+        levels (list): interpolate to these pressure levels [Pa]
+        workers (int): number of processes, default number of cores, 1 reads serially
+        concat (bool): combine stations into one Dataset with a station dimension
+        **kwargs: see igra, e.g. uadb (bool), debug (bool) to raise the first error
+
+    Returns:
+        dict, Dataset : profiles by station or with station dimension
+        dict, Dataset : station information
+        dict : error messages by station
+    """
+    import os
+    import traceback
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from concurrent.futures.process import BrokenProcessPool
+    from . import support as sp
+
+    if isinstance(idents, str):
+        idents = [idents]
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    data, station, errors = {}, {}, {}
+    jobs = [(ident, _station_file(ident, directory, uadb=kwargs.get('uadb', False))) for ident in idents]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = {pool.submit(_igra_worker, ident, filename, variables, levels, kwargs): ident
+                       for ident, filename in jobs}
+            for future in as_completed(futures):
+                try:
+                    ident, idata, istation, error = future.result()
+                except BrokenProcessPool as e:
+                    ident, idata, istation, error = futures[future], None, None, "worker died: %r" % e
+                except Exception:
+                    if kwargs.get('debug', False):
+                        for pending in futures:
+                            pending.cancel()  # not started yet (shutdown(cancel_futures) requires 3.9)
+                        raise
+                    # traceback of the worker is chained as cause
+                    ident, idata, istation, error = futures[future], None, None, traceback.format_exc()
+                _collect(ident, idata, istation, error, data, station, errors, **kwargs)
+    else:
+        for ident, filename in jobs:
+            _collect(*_igra_worker(ident, filename, variables, levels, kwargs), data, station, errors, **kwargs)
+
+    sp.message("Stations read:", len(data), "Errors:", len(errors), **kwargs)
+    # same order as idents
+    data = {i: data[i] for i in idents if i in data}
+    station = {i: station[i] for i in idents if i in station}
+    if concat:
+        data, station = _concat_stations(data), _concat_stations(station)
+    return data, station, errors
+
+
+def _station_file(ident, directory, uadb=False):
+    """ Station file in a directory
+
+    Args:
+        ident (str): IGRA ID or WMO ID
+        directory (str): directory of station files
+        uadb (bool): UADB or IGRAv2 files
+
+    Returns:
+        str : filename (might not exist)
+    """
+    import os
+    if uadb:
+        return os.path.join(directory, 'uadb_trhc_%s.txt' % str(int(ident)))
+    for ifile in ['%s-data.txt.zip', '%s-data.txt.gz', '%s-data.txt']:
+        filename = os.path.join(directory, ifile % ident)
+        if os.path.isfile(filename):
+            return filename
+    return os.path.join(directory, '%s-data.txt.zip' % ident)
+
+
+def _igra_worker(ident, filename, variables, levels, kwargs):
+    """ Read one station, errors are returned as message
+
+    Returns:
+        str : ident
+        Dataset : profiles or None
+        Dataset : station information or None
+        str : error message or None
+    """
+    import traceback
+    try:
+        reader = uadb if kwargs.get('uadb', False) else igra
+        data, station = reader(ident, filename, variables=variables, levels=levels, **kwargs)
+        return ident, data, station, None
+    except Exception as e:
+        if kwargs.get('debug', False):
+            raise e
+        return ident, None, None, traceback.format_exc()
+
+
+def _collect(ident, data, station, error, odata, ostation, errors, **kwargs):
+    """ Store the result or the error of one station
+    """
+    from . import support as sp
+    if error is not None:
+        errors[ident] = error
+        sp.message("Error:", ident, error.strip().splitlines()[-1], **kwargs)
+        return
+    odata[ident] = data
+    ostation[ident] = station
+    sp.message("Finished:", ident, **kwargs)
+
+
+def _concat_stations(data):
+    """ Combine Datasets along a new station dimension (outer join of dates)
+
+    Args:
+        data (dict): Datasets by station
+
+    Returns:
+        Dataset : with station dimension or None
+    """
+    import pandas as pd
+    import xarray as xr
+    data = {i: j for i, j in data.items() if j is not None}
+    if len(data) == 0:
+        return None
+    data = xr.concat(list(data.values()), dim=pd.Index(list(data.keys()), name='station'), join='outer',
+                     combine_attrs='drop_conflicts')
+    return data
+
+
+def to_std_levels(ident, filename, levels=None, return_table=False, variables=None, vertical='pres', **kwargs):
     """ Convert IGRA table data to xarray on std pressure levels
 
+    With variables, only these columns are decoded (IGRAv2) and interpolated. Without
+    return_table, only the new levels are interpolated, not all levels of a sounding, and
+    soundings that report all levels are not interpolated at all. With vertical='gph',
+    profiles are interpolated linearly in geopotential height to height levels instead.
+
     Args:
         ident (str): IGRA ID
         filename (str): filename to read
-        levels (list): pressure levels to interpolate to
+        levels (list): pressure levels to interpolate to (or heights [m] with vertical='gph')
         return_table (bool): keep data as table not array
-        **kwargs:
+        variables (list): read and interpolate only these variables
+        vertical (str): vertical coordinate, pres (log-pressure) or gph (linear)
+        **kwargs: e.g. chunksize (int) to read and interpolate blocks of soundings,
+                  cache (str, bool) directory of the parsed table cache, maxsize (int) of the cache,
+                  workers (int) to read and interpolate parts of the file in parallel,
+                  derive (list, bool) variables to derive before interpolation (dewp, vp, shumi, rhumi, dpd,
+                  see derived.humidity, and wind components u, v, see derived.components), dewp, vp, shumi,
+                  u and v in variables are derived as well, with u and v windd and winds are derived back
+                  from the interpolated components,
+                  saturation (str) formula of the saturation vapor pressure (bolton, magnus, foeewmo),
+                  hypsometric (bool) fill missing pressure from gph and missing gph from pressure before
+                  interpolation (see derived.hypsometric), levels without pressure are dropped otherwise
 
     Returns:
         Dataset : profiles either as 2d Arrays or as table
         Dataset : station information
     """
     import numpy as np
+    import pandas as pd
     from . import support as sp
     from . import std_plevels
-    from .interp import dataframe
+    from .cache import table as cache_table
+    from .derived import _variables as derived, _humidity
 
+    if vertical not in ('pres', 'gph'):
+        raise ValueError("Unknown vertical coordinate: %s (pres, gph)" % vertical)
     if levels is None:
+        if vertical == 'gph':
+            raise ValueError("Height levels are required with vertical='gph'")
         levels = std_plevels
+    log = vertical == 'pres'
 
     kwargs = sp.kw_handle(kwargs, mname=ident, adddate=True)
     sp.message(ident, levels, **kwargs)
+    derive = kwargs.get('derive', None)
+    if derive is True:
+        derive = list(derived.keys())
+    derive = [] if derive is None or derive is False else list(np.atleast_1d(derive))
+    if variables is not None:
+        derive += [i for i in variables if i in ('dewp', 'vp', 'shumi', 'u', 'v') and i not in derive]
+    if 'u' in derive or 'v' in derive:
+        derive += [i for i in ('u', 'v') if i not in derive]  # both components
+    kwargs['derive'] = derive
+    if variables is not None:
+        variables = [i for i in variables if i in [j[0] for j in _igra_record]]  # columns of the table
+        variables += [j for i in derive for j in derived[i] + [i] if j not in variables]  # inputs and derived
+        if len(variables) == 0:
+            variables = None  # nothing to select (e.g. flag_int)
+    if variables is not None:
+        if kwargs.get('hypsometric', False):
+            variables += [i for i in ('gph', 'temp') if i not in variables]
+        if vertical not in variables:
+            variables.append(vertical)
+    only_levels = not return_table
 
     # READ ASCII
-    sp.message("Reading ascii data into dataframes", **kwargs)
-    if kwargs.get('uadb', False):
-        data, station = uadb_ascii_to_dataframe(filename, **kwargs)  # Dataframe
+    if kwargs.get('chunksize', None) is not None:
+        #
+        # READ ASCII and interpolate block by block
+        #
+        sp.message("Reading ascii data and interpolating in blocks", **kwargs)
+        data, station, nmiss = [], [], 0
+        for idata, istation in iter_ascii_to_dataframe(filename, variables=variables, **kwargs):
+            idata, imiss = _interpolate(_derive(idata, **kwargs), vertical, levels, variables=variables,
+                                        only_levels=only_levels, log=log, **kwargs)
+            nmiss += imiss
+            data.append(idata)
+            station.append(istation)
+        sp.message("Missing pressure values", nmiss, **kwargs)
+        data = pd.concat(data)
+        station = pd.concat(station)
+        if not data.index.is_monotonic_increasing:
+            data = data.sort_index(kind='mergesort')
+    elif (kwargs.get('workers') or 1) > 1 and not kwargs.get('uadb', False) and kwargs.get('cache') in (None, False):
+        #
+        # READ ASCII and interpolate parts of the file in parallel
+        #
+        sp.message("Reading ascii data and interpolating in %d processes" % kwargs['workers'], **kwargs)
+        data, station, nlines, nmiss = _igra_parse_parallel(_read_ascii(filename), levels=levels, variables=variables,
+                                                            level_column=vertical, only_levels=only_levels, **kwargs)
+        sp.message("IGRAv2 Lines read:", nlines - 1, "Header count:", len(station), **kwargs)
+        sp.message("Missing pressure values", nmiss, **kwargs)
     else:
-        data, station = ascii_to_dataframe(filename, **kwargs)  # DataFrame
-
-    #
-    # interpolation to standard pressure levels
-    #
-    # Todo Convert pressure to gph
-    # Todo Convert gph to pressure
-    pindex = np.isfinite(data['pres'])   # because of geopotential height in early days
-    sp.message("Missing pressure values", (~pindex).sum(), **kwargs)
-    sp.message("Interpolating to standard pressure levels", **kwargs)
-    data = dataframe(data[pindex], 'pres', levels=levels, **kwargs)
+        sp.message("Reading ascii data into dataframes", **kwargs)
+        if kwargs.get('cache', None) not in (None, False):
+            data, station = cache_table(filename, **kwargs)  # DataFrame (cached)
+        elif kwargs.get('uadb', False):
+            data, station = uadb_ascii_to_dataframe(filename, **kwargs)  # Dataframe
+        else:
+            data, station = ascii_to_dataframe(filename, variables=variables, **kwargs)  # DataFrame
+
+        #
+        # derived variables and interpolation to standard pressure levels
+        #
+        data = _derive(data, **kwargs)
+        sp.message("Interpolating to standard pressure levels", **kwargs)
+        data, nmiss = _interpolate(data, vertical, levels, variables=variables, only_levels=only_levels, log=log,
+                                   **kwargs)
+        sp.message("Missing pressure values", nmiss, **kwargs)
+    if 'u' in derive:
+        data = _wind_back(data)
     sp.message("Converting to xarray", **kwargs)
     data = data.to_xarray()
     sp.message("Adding Metadata", **kwargs)
     for ivar in list(data.data_vars):
         if ivar in _metadata.keys():
-            if 'dpd' in ivar:
-                if 'dewp' not in data.data_vars:
-                    attrs = _metadata[ivar]
-                    # attrs.update({'esat': 'foeewmo', 'rounded': 1})
-                    data[ivar].attrs.update(attrs)
-            else:
-                data[ivar].attrs.update(_metadata[ivar])
+            data[ivar].attrs.update(_metadata[ivar])
+        if ivar in derive and ivar in _humidity:
+            data[ivar].attrs['esat'] = kwargs.get('saturation', 'bolton')
 
     if kwargs.get('uadb', False):
         data.attrs.update({'ident': ident, 'source': 'NCAR RSA', 'dataset': 'UADB, ds370.1', 'processed': 'UNIVIE, IMG',
-                           'interpolated': 'to pres levs (#%d)' % len(levels)})
+                           'interpolated': 'to %s levs (#%d)' % (vertical, len(levels))})
     else:
         data.attrs.update({'ident': ident, 'source': 'NOAA NCDC', 'dataset': 'IGRAv2', 'processed': 'UNIVIE, IMG',
-                           'interpolated': 'to pres levs (#%d)' % len(levels)})
+                           'interpolated': 'to %s levs (#%d)' % (vertical, len(levels))})
+    if vertical != 'pres':
+        if 'pres' in data.variables:
+            data['pres'].attrs.pop('axis', None)
+        data[vertical].attrs['axis'] = 'Z'
 
     sp.message("Converting temperature and humidity", **kwargs)
-    data['temp'] += 273.2  # Kelvin
-    data['rhumi'] /= 100.  # ratio
+    if 'temp' in data.data_vars:
+        data['temp'] += 273.2  # Kelvin
+    if 'dewp' in data.data_vars:
+        data['dewp'] += 273.2  # Kelvin
+    if 'rhumi' in data.data_vars:
+        data['rhumi'] /= 100.  # ratio
 
     # if as_table:
     #     station = station.to_xarray().reindex(date=data.date)
@@ -173,16 +401,132 @@ def to_std_levels(ident, filename, levels=None, return_table=False, **kwargs):
     #
     # Convert to 2d Array
     #
-    data = dataframe_to_array(data, dim='date', plev='pres', levels=levels)
+    data = dataframe_to_array(data, dim='date', plev=vertical, levels=levels,
+                              duplicates=kwargs.get('duplicates', 'first'))
     return data, station
 
 
-def ascii_to_dataframe(filename, all_columns=False, **kwargs):
+def update(ident, filename, update_file, return_table=False, levels=None, **kwargs):
+    """ Append new soundings of an IGRAv2 update file (data-y2d) to a processed station
+
+    Only soundings after the last stored date are read and interpolated. A NetCDF file is
+    opened lazily (only date and pres are read) and appended in place if the date dimension
+    is unlimited, otherwise it is rewritten once with an unlimited date dimension. Cache
+    entries (cache.table) are not updated, these are parsed tables of one ascii file.
+
+    Args:
+        ident (str): IGRA ID
+        filename (str, Dataset): NetCDF file or Dataset of processed profiles (read.igra)
+        update_file (str): update filename (e.g. -data-beg2019.txt.zip)
+        return_table (bool): stored profiles are a table (return_table=True)
+        levels (list): pressure levels of a table, default from the stored profiles
+        **kwargs:
+
+    Returns:
+        Dataset : profiles including new soundings (Dataset) or only new soundings (NetCDF file) or None
+        Dataset : station information of new soundings or None
+    """
+    import os
+    import numpy as np
+    import xarray as xr
+    from . import support as sp
+
+    kwargs = sp.kw_handle(kwargs, mname=ident, adddate=True)
+    if isinstance(filename, xr.Dataset):
+        data = filename
+        filename = None
+        last = data['date'].values.max()
+        if not return_table:
+            levels = data['pres'].values.tolist()
+    else:
+        with xr.open_dataset(filename) as stored:
+            last = stored['date'].values.max()
+            if not return_table:
+                levels = stored['pres'].values.tolist()
+    #
+    # anything new? (header lines only)
+    #
+    buf = _read_ascii(update_file)
+    dates = _igra_header_dates(_igra_header_lines(buf, _igra_header_offsets(buf)[0]))
+    del buf
+    sp.message("Soundings after", last, ":", (dates > last).sum(), **kwargs)
+    if not (dates > last).any():
+        return (data if filename is None else None), None
+
+    new, station = to_std_levels(ident, update_file, levels=levels, return_table=return_table,
+                                 start=last + np.timedelta64(1, 'ns'), **kwargs)
+    if not return_table:
+        new = new.reindex(pres=levels)
+
+    if filename is None:
+        return xr.concat([data, new], dim='date'), station
+
+    if not _append_netcdf(filename, new, dim='date'):
+        # once, then appended in place
+        sp.message("Rewriting with unlimited date:", filename, **kwargs)
+        with xr.open_dataset(filename) as stored:
+            xr.concat([stored, new], dim='date').to_netcdf(filename + '.tmp', unlimited_dims=['date'])
+        os.replace(filename + '.tmp', filename)
+    else:
+        sp.message("Appended to:", filename, **kwargs)
+    return new, station
+
+
+def _append_netcdf(filename, data, dim='date'):
+    """ Append a Dataset along an unlimited dimension of a NetCDF file
+
+    Args:
+        filename (str): NetCDF filename
+        data (Dataset): data to append, same variables and other dimensions
+        dim (str): unlimited dimension
+
+    Returns:
+        bool : appended or not (not unlimited, netCDF4 missing, not representable)
+    """
+    import numpy as np
+    import pandas as pd
+    try:
+        import netCDF4
+    except ImportError:
+        return False
+
+    with netCDF4.Dataset(filename, 'r') as nc:
+        if dim not in nc.dimensions or not nc.dimensions[dim].isunlimited():
+            return False
+        if set(nc.variables) != set(data.variables):
+            return False
+        units = nc.variables[dim].units
+        calendar = getattr(nc.variables[dim], 'calendar', 'standard')
+        integer = nc.variables[dim].dtype.kind in 'iu'
+
+    times = netCDF4.date2num(pd.to_datetime(data[dim].values).to_pydatetime(), units, calendar=calendar)
+    if integer and not np.all(np.mod(times, 1) == 0):
+        return False  # units to coarse for new dates
+
+    with netCDF4.Dataset(filename, 'a') as nc:
+        n = nc.dimensions[dim].size
+        nc.variables[dim][n:] = times
+        for ivar in data.data_vars:
+            var = nc.variables[ivar]
+            values = data[ivar].transpose(*var.dimensions).values
+            index = tuple(slice(n, None) if i == dim else slice(None) for i in var.dimensions)
+            invalid = ~np.isfinite(values)
+            var[index] = np.ma.masked_array(np.where(invalid, 0, values), mask=invalid)  # no cast of NaN if packed
+    return True
+
+
+def ascii_to_dataframe(filename, all_columns=False, engine='numpy', start=None, end=None, workers=None, variables=None,
+                       **kwargs):
     """Read IGRA version 2 Data from NOAA
 
     Args:
         filename (str): Filename
         all_columns (bool): return all columns or just data
+        engine (str): numpy (vectorized) or python (line by line reference)
+        start (str, datetime): first date to read, soundings before are skipped
+        end (str, datetime): last date to read, soundings after are skipped
+        workers (int): parse parts of the file in this many processes (numpy engine)
+        variables (list): decode only these columns, pres is always read
 
     Returns:
         DataFrame : Table of radiosonde soundings with date as index and variables as columns
@@ -510,39 +854,446 @@ def ascii_to_dataframe(filename, all_columns=False, **kwargs):
                     data remain at the same level.
             -9999 = Value missing prior to quality assurance.
     """
-    import datetime
-    import gzip
-    import zipfile
     import os
-    import io
+    from . import support as sp
+
+    if not os.path.isfile(filename):
+        raise IOError("File not Found! %s" % filename)
+
+    if engine == 'numpy' and workers is not None and workers > 1:
+        data, headers, nlines, nmiss = _igra_parse_parallel(_read_ascii(filename), workers, all_columns=all_columns,
+                                                            start=start, end=end, variables=variables)
+    elif engine == 'numpy':
+        data, headers, nlines = _igra_parse_numpy(_read_ascii(filename), all_columns=all_columns, start=start,
+                                                  end=end, variables=variables)
+    elif engine == 'python':
+        data, headers, nlines = _igra_parse_python(_read_ascii(filename).decode('utf-8').splitlines(),
+                                                   all_columns=all_columns, start=start, end=end)
+        if variables is not None:
+            data = data[[i for i in data.columns if i == 'pres' or i in variables]]
+    else:
+        raise ValueError("Unknown engine: %s (numpy, python)" % engine)
+
+    sp.message("IGRAv2 Lines read:", nlines - 1, "Header count:", len(headers), **kwargs)
+    return data, headers
+
+
+def ascii_to_compact(filename, all_columns=False, start=None, end=None, **kwargs):
+    """ Read IGRA version 2 Data as compact, scaled integer Dataset
+
+    Values are kept as in the file (int16/int32, -9999 and -8888 as missing
+    values) with the CF scale_factor applied lazily on access. Flags and
+    source codes are 1-byte codes (flag_values, flag_meanings), dates are
+    stored once per sounding and each level refers to its sounding by isound.
+
+    Args:
+        filename (str): Filename
+        all_columns (bool): return all columns or just data
+        start (str, datetime): first date to read, soundings before are skipped
+        end (str, datetime): last date to read, soundings after are skipped
+
+    Returns:
+        Dataset : level and sounding dimensions
+
+    Examples:
+        >>> data = ascii_to_compact('AUM00011035-data.txt.gz')
+        >>> data['temp'].values  # degC, float32
+        >>> data['date'].values[data['isound'].values]  # date of each level
+        >>> data['temp'].encoding  # scale_factor, missing_value of the raw integers
+    """
+    import os
+    import warnings
+    import numpy as np
+    import xarray as xr
+    from . import support as sp
+
+    if not os.path.isfile(filename):
+        raise IOError("File not Found! %s" % filename)
+
+    headers, columns, isound, nlines = _igra_decode(_read_ascii(filename), all_columns=all_columns, start=start,
+                                                    end=end)
+    data = xr.Dataset()
+    for ivar, a, b, scale, extra in _igra_record:
+        if ivar not in columns:
+            continue
+        if scale is None:
+            data[ivar] = ('level', *_compact_codes(columns[ivar]))
+            continue
+        attrs = {} if ivar in ('ltyp1', 'ltyp2') else {'missing_value': np.array([-9999, -8888])}
+        if scale != 1:
+            attrs['scale_factor'] = 1. / scale
+        data[ivar] = ('level', _compact_int(columns[ivar], small=ivar in ('ltyp1', 'ltyp2')), attrs)
+    data['isound'] = ('level', isound.astype(np.int32))
+    data['numlev'] = ('sounding', headers['numlev'].astype(np.int16))
+    for ivar in ['p_src', 'np_src']:
+        if ivar in headers:
+            data[ivar] = ('sounding', *_compact_codes(headers[ivar]))
+    data['lat'] = ('sounding', headers['lat'].astype(np.int32), {'scale_factor': 1e-4})
+    data['lon'] = ('sounding', headers['lon'].astype(np.int32), {'scale_factor': 1e-4})
+    data = data.assign_coords(date=('sounding', headers['date']))
+    for ivar in data.data_vars:
+        if 'missing_value' in data[ivar].attrs:
+            data[ivar].attrs['missing_value'] = data[ivar].attrs['missing_value'].astype(data[ivar].dtype)
+
+    sp.message("IGRAv2 Lines read:", nlines - 1, "Header count:", data.sounding.size, **kwargs)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # multiple missing values
+        return xr.decode_cf(data)
+
+
+def _compact_int(values, small=False):
+    """ Smallest integer type holding the values
+
+    Args:
+        values (ndarray): integer values
+        small (bool): try int8 first
+
+    Returns:
+        ndarray : int8, int16 or int32 values
+    """
+    import numpy as np
+    if values.size == 0:
+        return values.astype(np.int8 if small else np.int16)
+    for itype in ([np.int8] if small else []) + [np.int16, np.int32]:
+        info = np.iinfo(itype)
+        if info.min <= values.min() and values.max() <= info.max:
+            return values.astype(itype)
+    return values
+
+
+def _compact_codes(values):
+    """ Characters or strings to 1-byte codes
+
+    Args:
+        values (ndarray): uint8 characters or strings
+
+    Returns:
+        ndarray : int8 codes
+        dict : flag_values and flag_meanings attributes
+    """
+    import numpy as np
+    if values.dtype == np.uint8:
+        counts = np.bincount(values, minlength=256)
+        labels = np.flatnonzero(counts)
+        lookup = np.zeros(256, dtype=np.int8)
+        lookup[labels] = np.arange(labels.size)
+        codes = lookup[values]
+        labels = [chr(i) for i in labels]
+    else:
+        labels, codes = np.unique(values.astype(str), return_inverse=True)
+        codes = codes.astype(np.int8)
+    meanings = [i.strip() if i.strip() else 'blank' for i in labels]
+    return codes, {'flag_values': np.arange(len(meanings), dtype=np.int8), 'flag_meanings': ' '.join(meanings)}
+
+
+def iter_ascii_to_dataframe(filename, chunksize=1000, all_columns=False, uadb=False, blocksize=16777216, start=None,
+                            end=None, variables=None, **kwargs):
+    """ Read IGRAv2 or UADB Data in blocks of soundings
+
+    The decompressed stream is read in pieces of blocksize bytes and only complete
+    soundings are parsed, the full text is never kept in memory. Soundings with
+    the same date fields are kept in the same block.
+
+    Args:
+        filename (str): Filename
+        chunksize (int): number of soundings per block
+        all_columns (bool): return all columns or just data (IGRAv2)
+        uadb (bool): UADB or IGRAv2 format
+        blocksize (int): number of bytes to read at once
+        start (str, datetime): first date to read (IGRAv2)
+        end (str, datetime): last date to read (IGRAv2)
+        variables (list): decode only these columns, pres is always read (IGRAv2)
+        **kwargs:
+
+    Yields:
+        DataFrame : Table of radiosonde soundings with date as index and variables as columns
+        DataFrame : Station Information
+    """
+    import os
+    from . import support as sp
+
+    if not os.path.isfile(filename):
+        raise IOError("File not Found! %s" % filename)
+
+    if chunksize < 1:
+        raise ValueError("Requires at least 1 sounding per block: %s" % chunksize)
+
+    with _open_ascii(filename) as infile:
+        buf = b''
+        eof = False
+        while not eof:
+            new = infile.read(blocksize)
+            eof = len(new) == 0
+            buf += new
+            offsets = _block_headers(buf, uadb=uadb)  # once per read
+            first, begin = 0, 0
+            while begin < len(buf):
+                last = _block_end(buf, offsets, first, chunksize, uadb=uadb, eof=eof)
+                if last is None:
+                    break  # read more
+
+                cut = int(offsets[last]) if last < offsets.size else len(buf)
+                block = buf[begin:cut]
+                first, begin = last, cut
+                if uadb:
+                    data, headers, nlines, nmiss = _uadb_parse_numpy(block, **kwargs)
+                    sp.message("UADB Lines read:", nlines, "skipped:", nmiss, "Header:", len(headers), **kwargs)
+                else:
+                    data, headers, nlines = _igra_parse_numpy(block, all_columns=all_columns, start=start, end=end,
+                                                              variables=variables)
+                    if len(headers) == 0:
+                        continue  # outside of window
+                    sp.message("IGRAv2 Lines read:", nlines, "Header count:", len(headers), **kwargs)
+                yield data, headers
+            buf = buf[begin:]
+
+
+def _block_headers(buf, uadb=False):
+    """ Byte offsets of all header lines in a buffer
+
+    Args:
+        buf (bytes): content of an IGRAv2 or UADB file
+        uadb (bool): UADB or IGRAv2 format
+
+    Returns:
+        ndarray : offsets
+    """
+    import numpy as np
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    offsets = np.flatnonzero(raw == (ord('H') if uadb else ord('#')))
+    return offsets[(offsets == 0) | (raw[offsets - 1] == 10)]
+
+
+def _block_end(buf, offsets, first, chunksize, uadb=False, eof=False):
+    """ Header after chunksize complete soundings
+
+    Args:
+        buf (bytes): content of an IGRAv2 or UADB file
+        offsets (ndarray): offsets of header lines (see _block_headers)
+        first (int): header of the block
+        chunksize (int): number of soundings
+        uadb (bool): UADB or IGRAv2 format
+        eof (bool): buf holds the end of the file
+
+    Returns:
+        int : header of the next block, offsets.size for the rest of the file or None if more data is required
+    """
+    a, b = (38, 53) if uadb else (13, 31)  # date fields
+    k = first + chunksize
+    while k < offsets.size:
+        if buf.find(b'\n', offsets[k]) == -1 and not eof:
+            return None  # incomplete header
+
+        if buf[offsets[k - 1] + a:offsets[k - 1] + b] != buf[offsets[k] + a:offsets[k] + b]:
+            return k
+        k += 1
+    return offsets.size if eof else None
+
+
+def sounding_index(filename, rebuild=False, save=True, **kwargs):
+    """ Byte offset index of IGRAv2 soundings, kept in a sidecar file
+
+    The index is saved next to the data file (filename + '.idx.npz') and rebuilt
+    when the size or modification time of the data file changed. Offsets refer
+    to the decompressed content, reading a compressed file still has to
+    decompress up to the offset, but does not parse anything.
+
+    Args:
+        filename (str): Filename (plain or gz)
+        rebuild (bool): ignore an existing sidecar file
+        save (bool): write the sidecar file, if the directory is writable
+        **kwargs:
+
+    Returns:
+        DataFrame : date (index), offset, nbytes, numlev, p_src, np_src, lat, lon
+    """
+    import os
+    import numpy as np
+    import pandas as pd
+    from . import support as sp
+    from .cache import _write
+
+    if not os.path.isfile(filename):
+        raise IOError("File not Found! %s" % filename)
+
+    info = os.stat(filename)
+    sidecar = filename + '.idx.npz'
+    index = None
+    if not rebuild and os.path.isfile(sidecar):
+        with np.load(sidecar, allow_pickle=False) as infile:
+            if infile['size'] == info.st_size and infile['mtime'] == info.st_mtime_ns:
+                index = {i: infile[i] for i in infile.files if i not in ('size', 'mtime')}
+                sp.message("Sounding index read from:", sidecar, **kwargs)
+
+    if index is None:
+        buf = _read_ascii(filename)
+        offsets, ends = _igra_header_offsets(buf)
+        index = _igra_header_columns(_igra_header_lines(buf, offsets), all_columns=True)
+        index['offset'] = offsets
+        index['nbytes'] = ends - offsets
+        index['p_src'] = index['p_src'].astype(str)
+        index['np_src'] = index['np_src'].astype(str)
+        sp.message("Sounding index built:", offsets.size, "soundings", **kwargs)
+        if save:
+            try:
+                _write(sidecar, dict(index, size=info.st_size, mtime=info.st_mtime_ns))
+                sp.message("Sounding index written to:", sidecar, **kwargs)
+            except OSError as e:
+                sp.message("Sounding index not written:", repr(e), **kwargs)  # e.g. read-only directory
+
+    index = pd.DataFrame(index)[['date', 'offset', 'nbytes', 'numlev', 'p_src', 'np_src', 'lat', 'lon']]
+    return index.set_index('date')
+
+
+def read_soundings(filename, dates=None, start=None, end=None, all_columns=False, variables=None, **kwargs):
+    """ Read selected IGRAv2 soundings with the sidecar index
+
+    Seeks to the byte offsets of the selected soundings, only these are parsed.
+
+    Args:
+        filename (str): Filename (plain or gz)
+        dates (list): dates of soundings to read
+        start (str, datetime): first date to read
+        end (str, datetime): last date to read
+        all_columns (bool): return all columns or just data
+        variables (list): decode only these columns, pres is always read
+        **kwargs: e.g. rebuild (bool) the index
+
+    Returns:
+        DataFrame : Table of radiosonde soundings with date as index and variables as columns
+        DataFrame : Station Information
+    """
     import numpy as np
     import pandas as pd
     from . import support as sp
 
+    index = sounding_index(filename, **kwargs)
+    select = np.ones(len(index), dtype=bool)
+    if dates is not None:
+        select &= index.index.isin(pd.to_datetime(np.atleast_1d(dates)))
+    if start is not None:
+        select &= index.index >= pd.Timestamp(start)
+    if end is not None:
+        select &= index.index <= pd.Timestamp(end)
+
+    isel = np.flatnonzero(select)
+    blocks = []
+    with _open_ascii(filename) as infile:
+        # consecutive soundings are read at once
+        for irun in np.split(isel, np.flatnonzero(np.diff(isel) != 1) + 1):
+            if irun.size == 0:
+                continue
+            offset = index['offset'].values[irun[0]]
+            infile.seek(offset)
+            blocks.append(infile.read(index['offset'].values[irun[-1]] + index['nbytes'].values[irun[-1]] - offset))
+
+    data, headers, nlines = _igra_parse_numpy(b''.join(blocks), all_columns=all_columns, variables=variables)
+    sp.message("IGRAv2 Lines read:", nlines, "Header count:", len(headers), **kwargs)
+    return data, headers
+
+
+def inventory(filename, **kwargs):
+    """ Inventory of an IGRAv2 station file from header lines only
+
+    Data records are jumped over by NUMLEV and never decoded.
+
+    Args:
+        filename (str): Filename
+        **kwargs:
+
+    Returns:
+        DataFrame : date (index), numlev, p_src, np_src, lat, lon of every sounding
+        dict : station summary, ident, start, end, soundings and
+               soundings per year, per hour and per number of levels (Series)
+    """
+    import os
+    import pandas as pd
+    from . import support as sp
+
     if not os.path.isfile(filename):
         raise IOError("File not Found! %s" % filename)
 
+    buf = _read_ascii(filename)
+    offsets, ends = _igra_header_offsets(buf)
+    head = _igra_header_lines(buf, offsets)
+    del buf
+    headers = pd.DataFrame(_igra_header_columns(head, all_columns=True)).set_index('date')
+    sp.message("IGRAv2 Header count:", len(headers), **kwargs)
+    dates = headers.index
+    summary = {'ident': _decode_str(head[:1], 1, 12)[0] if len(head) > 0 else '',
+               'start': dates.min(),
+               'end': dates.max(),
+               'soundings': len(headers),
+               'year': headers.groupby(dates.year).size().rename('soundings').rename_axis('year'),
+               'hour': headers.groupby(dates.hour).size().rename('soundings').rename_axis('hour'),
+               'numlev': headers.groupby('numlev').size().rename('soundings')}
+    return headers, summary
+
+
+def _read_ascii(filename):
+    """ Read the decompressed content of a (zip, gz or plain) ascii file
+
+    Args:
+        filename (str): filename
+
+    Returns:
+        bytes : file content
+    """
+    with _open_ascii(filename) as infile:
+        return infile.read()
+
+
+def _open_ascii(filename):
+    """ Open a (zip, gz or plain) ascii file as decompressed binary stream
+
+    Args:
+        filename (str): filename
+
+    Returns:
+        file : binary file object
+    """
+    import gzip
+    import zipfile
+
     if '.zip' in filename:
         archive = zipfile.ZipFile(filename, 'r')
         inside = archive.namelist()
-        tmp = archive.open(inside[0])
-        tmp = io.TextIOWrapper(tmp, encoding='utf-8')
-        tmp = tmp.read()
-        archive.close()
-        data = tmp.splitlines()  # Memory (faster)
+        return archive.open(inside[0])  # archive is closed with the member
     elif '.gz' in filename:
-        with gzip.open(filename, 'rt', encoding='utf-8') as infile:
-            tmp = infile.read()  # alternative readlines (slower)
-            data = tmp.splitlines()  # Memory (faster)
+        return gzip.open(filename, 'rb')
     else:
-        with open(filename, 'rt') as infile:
-            tmp = infile.read()  # alternative readlines (slower)
-            data = tmp.splitlines()  # Memory (faster)
+        return open(filename, 'rb')
+
+
+def _igra_parse_python(data, all_columns=False, start=None, end=None):
+    """ Reference IGRAv2 parser, line by line
+
+    Args:
+        data (list): lines of an IGRAv2 file
+        all_columns (bool): return all columns or just data
+        start (str, datetime): first date to read
+        end (str, datetime): last date to read
+
+    Returns:
+        DataFrame : Table of radiosonde soundings
+        DataFrame : Station Information
+        int : number of lines
+    """
+    import datetime
+    import numpy as np
+    import pandas as pd
 
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
     raw = []
     headers = []
     dates = []
+    skip = 0
     for i, line in enumerate(data):
+        if skip > 0:
+            skip -= 1  # data record outside of window
+            continue
+
         if line[0] == '#':
             # Header
             ident = line[1:12]
@@ -567,6 +1318,10 @@ def ascii_to_dataframe(filename, all_columns=False, **kwargs):
                 time = time.replace('99', '00')
 
             idate = datetime.datetime.strptime(year + month + day + time, '%Y%m%d%H%M%S')
+            if (start is not None and idate < start) or (end is not None and idate > end):
+                skip = numlev
+                continue
+
             if all_columns:
                 headers.append((idate, numlev, p_src.strip(), np_src.strip(), lat, lon))
             else:
@@ -593,7 +1348,6 @@ def ascii_to_dataframe(filename, all_columns=False, **kwargs):
                 raw.append((press, gph, temp, rh, dpdp, wdir, wspd))
             dates.append(idate)
 
-    sp.message("IGRAv2 Lines read:", i, "Header count:", len(headers), **kwargs)
     if all_columns:
         c = ['ltyp1', 'ltyp2', 'etime', 'pres', 'pflag', 'gph', 'zflag', 'temp', 'tflag', 'rhumi', 'dpd', 'windd',
              'winds']
@@ -607,27 +1361,624 @@ def ascii_to_dataframe(filename, all_columns=False, **kwargs):
             'date')
     else:
         headers = pd.DataFrame(data=headers, columns=['date', 'numlev', 'lat', 'lon']).set_index('date')
-    return out, headers
+    return out, headers, len(data)
 
 
-def metadata(filename):
-    """ Read IGRAv2 _metadata file according to readme
-
-    igra2-_metadata-readme.txt
+def _igra_parse_parallel(buf, workers, all_columns=False, start=None, end=None, levels=None, variables=None,
+                         level_column='pres', **kwargs):
+    """ Parse (and interpolate) parts of an IGRAv2 file in a pool of processes
 
-    Documentation for IGRA Station History Information
-    Accompanying IGRA Version 2.0.0b1
-    August 2014
+    The buffer is split at sounding boundaries into parts of similar size, soundings
+    with the same date stay together. Parts are parsed by _igra_parse_numpy and
+    concatenated in file order, same as parsing the whole buffer. With levels, each
+    part is also interpolated if the dates are in order, otherwise after concatenation.
 
     Args:
-        filename (str):  igra2-_metadata.txt
+        buf (bytes): content of an IGRAv2 file
+        workers (int): number of processes
+        all_columns (bool): return all columns or just data
+        start (str, datetime): first date to read
+        end (str, datetime): last date to read
+        levels (list): interpolate to these pressure levels
+        variables (list): decode and interpolate only these columns
+        level_column (str): interpolate in log pres or linear in gph
+        **kwargs:
 
     Returns:
-        DataFrame
+        DataFrame : Table of radiosonde soundings (interpolated with levels)
+        DataFrame : Station Information
+        int : number of lines
+        int : number of missing pressure values (with levels)
     """
     import numpy as np
     import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+
+    offsets, ends = _igra_header_offsets(buf)
+    dates = _igra_header_dates(_igra_header_lines(buf, offsets))
+    select = np.ones(dates.size, dtype=bool)
+    if start is not None:
+        select &= dates >= pd.Timestamp(start).to_datetime64()
+    if end is not None:
+        select &= dates <= pd.Timestamp(end).to_datetime64()
+    offsets, ends, dates = offsets[select], ends[select], dates[select]
+    ordered = dates.size < 2 or bool((dates[1:] >= dates[:-1]).all())
+    #
+    # parts of similar size, ending on a new date
+    #
+    size = np.cumsum(ends - offsets)
+    bounds = [0]
+    for k in range(1, workers):
+        i = max(int(np.searchsorted(size, size[-1] * k / workers if size.size else 0)), bounds[-1])
+        while 0 < i < dates.size and dates[i] == dates[i - 1]:
+            i += 1
+        if bounds[-1] < i < dates.size:
+            bounds.append(i)
+    bounds.append(dates.size)
+    parts = []
+    for i, j in zip(bounds[:-1], bounds[1:]):
+        if select.all() or (ends[i:j - 1] == offsets[i + 1:j]).all():
+            parts.append(buf[offsets[i]:ends[j - 1]])  # contiguous
+        else:
+            parts.append(b''.join([buf[k:l] for k, l in zip(offsets[i:j], ends[i:j])]))
+
+    interpolate = levels is not None and ordered
+    with ProcessPoolExecutor(max_workers=max(len(parts), 1)) as pool:
+        results = list(pool.map(_igra_parse_part, parts, [all_columns] * len(parts),
+                                [levels if interpolate else None] * len(parts), [variables] * len(parts),
+                                [kwargs] * len(parts), [level_column] * len(parts)))
+    if len(results) == 0:
+        return _igra_parse_numpy(b'', all_columns=all_columns, variables=variables) + (0,)
+
+    data = pd.concat([i[0] for i in results])
+    headers = pd.concat([i[1] for i in results])
+    nlines = sum(i[2] for i in results)
+    nmiss = sum(i[3] for i in results)
+    if levels is not None and not interpolate:
+        data, nmiss = _interpolate(_derive(data, **kwargs), level_column, levels, variables=variables,
+                                   log=level_column == 'pres', **kwargs)
+    return data, headers, nlines, nmiss
+
+
+def _igra_parse_part(buf, all_columns=False, levels=None, variables=None, kwargs=None, level_column='pres'):
+    """ Parse (and interpolate) a part of an IGRAv2 file, see _igra_parse_parallel
+
+    Returns:
+        DataFrame : Table of radiosonde soundings
+        DataFrame : Station Information
+        int : number of lines
+        int : number of missing pressure values
+    """
+    data, headers, nlines = _igra_parse_numpy(buf, all_columns=all_columns, variables=variables)
+    nmiss = 0
+    if levels is not None:
+        data, nmiss = _interpolate(_derive(data, **(kwargs or {})), level_column, levels, variables=variables,
+                                   log=level_column == 'pres', **(kwargs or {}))
+    return data, headers, nlines, nmiss
+
+
+def _interpolate(data, level_column, levels, variables=None, **kwargs):
+    """ Interpolate soundings with a valid level (see interp.dataframe)
+
+    Flags of the table (flag_hyps) are not interpolated, new levels get the flag of the
+    nearest level of the same sounding.
+
+    Args:
+        data (DataFrame): Table of radiosonde soundings
+        level_column (str): pres or gph
+        levels (list): new levels
+        variables (list): interpolate only these columns
+        **kwargs: e.g. only_levels, log, engine
+
+    Returns:
+        DataFrame : interpolated table
+        int : number of rows without level
+    """
+    import numpy as np
+    import pandas as pd
+    from .interp import dataframe
+
+    pindex = np.isfinite(data[level_column].values)  # because of geopotential height in early days
+    nmiss = int((~pindex).sum())
+    data = data[pindex]
+    flags = [i for i in ('flag_hyps',) if i in data.columns]
+    table = data[[level_column] + flags]
+    data = dataframe(data.drop(columns=flags), level_column, levels=levels, variables=variables, **kwargs)
+    if len(flags) > 0 and len(data) > 0:
+        left = pd.DataFrame({'date': data.index.values, level_column: data[level_column].values.astype(float),
+                             'row': np.arange(len(data))}).sort_values(level_column, kind='stable')
+        right = table.reset_index().astype({level_column: float}).sort_values(level_column, kind='stable')
+        nearest = pd.merge_asof(left, right, on=level_column, by='date', direction='nearest')
+        nearest = nearest.sort_values('row')
+        for iflag in flags:
+            data[iflag] = nearest[iflag].fillna(0).values.astype(np.int64)
+    elif len(flags) > 0:
+        for iflag in flags:
+            data[iflag] = np.zeros(0, dtype=np.int64)
+    return data, nmiss
+
+
+def _derive(data, derive=None, saturation='bolton', hypsometric=False, **kwargs):
+    """ Derived variables before interpolation (see derived)
+
+    Args:
+        data (DataFrame): Table of radiosonde soundings
+        derive (list): derived variables
+        saturation (str): saturation vapor pressure formula
+        hypsometric (bool): fill missing pres and gph
+        **kwargs:
+
+    Returns:
+        DataFrame : Table with derived columns
+    """
+    from .derived import humidity, components, hypsometric as fill_levels, _humidity
+    if hypsometric:
+        data = fill_levels(data, **kwargs)
+    if not derive:
+        return data
+    if any(i in _humidity for i in derive):
+        data = humidity(data, variables=[i for i in derive if i in _humidity], method=saturation, **kwargs)
+    if 'u' in derive or 'v' in derive:
+        data = components(data, **kwargs)
+    return data
+
+
+def _wind_back(data):
+    """ Wind direction and speed from interpolated components u, v
+
+    Direction and speed interpolated in log-pressure are kept where they agree with the
+    components (reported values), others are replaced (e.g. across north).
+
+    Args:
+        data (DataFrame): interpolated table with u, v, windd, winds
+
+    Returns:
+        DataFrame : table
+    """
+    import numpy as np
+    from .derived import uv_to_wind
+
+    if 'windd' not in data.columns or 'winds' not in data.columns:
+        return data
+    windd, winds = uv_to_wind(data['u'].values, data['v'].values)
+    with np.errstate(invalid='ignore'):
+        keep = np.abs(data['winds'].values - winds) < 1e-6
+        keep &= (np.abs((data['windd'].values - windd + 180.) % 360. - 180.) < 1e-6) | (winds == 0)
+    data = data.copy()
+    data['windd'] = np.where(keep, data['windd'].values, windd)
+    data['winds'] = np.where(keep, data['winds'].values, winds)
+    return data
+
+
+def _igra_parse_numpy(buf, all_columns=False, start=None, end=None, variables=None):
+    """ Vectorized IGRAv2 parser, decodes all columns in bulk
+
+    With start or end, only header lines are read and the data records of
+    soundings outside of the window are skipped by NUMLEV. With variables,
+    other columns are not decoded.
+
+    Args:
+        buf (bytes): content of an IGRAv2 file
+        all_columns (bool): return all columns or just data
+        start (str, datetime): first date to read
+        end (str, datetime): last date to read
+        variables (list): decode only these columns, pres is always read
+
+    Returns:
+        DataFrame : Table of radiosonde soundings
+        DataFrame : Station Information
+        int : number of lines
+    """
+    import numpy as np
+    import pandas as pd
+
+    headers, columns, isound, nlines = _igra_decode(buf, all_columns=all_columns, start=start, end=end,
+                                                    variables=variables)
+    headers['lat'] = headers['lat'] / 10000.
+    headers['lon'] = headers['lon'] / 10000.
+    dates = headers['date']
+    headers = pd.DataFrame(headers).set_index('date')
+    chars = np.array([chr(i) for i in range(256)], dtype=object)
+    for ivar, a, b, scale, extra in _igra_record:
+        if ivar not in columns:
+            continue
+        if scale is None:
+            columns[ivar] = chars[columns[ivar]]  # flags
+        else:
+            if scale != 1:
+                columns[ivar] = columns[ivar] / scale
+            columns[ivar] = _missing(columns[ivar], [-999.9, -9999, -8888, -888.8])  # known missing values by IGRAv2
+    out = pd.DataFrame(columns, index=pd.DatetimeIndex(dates[isound]))
+    out.index.name = 'date'
+    return out, headers, nlines
+
+
+# IGRAv2 data record: name, columns, scale (None for characters), only with all_columns
+_igra_record = [('ltyp1', 0, 1, 1, True), ('ltyp2', 1, 2, 1, True), ('etime', 3, 8, 1, True),
+                ('pres', 9, 15, 1, False), ('pflag', 15, 16, None, True), ('gph', 16, 21, 1, False),
+                ('zflag', 21, 22, None, True), ('temp', 22, 27, 10, False), ('tflag', 27, 28, None, True),
+                ('rhumi', 28, 33, 10, False), ('dpd', 34, 39, 10, False), ('windd', 40, 45, 1, False),
+                ('winds', 46, 51, 10, False)]
+
+
+def _igra_decode(buf, all_columns=False, start=None, end=None, variables=None):
+    """ Decode IGRAv2 header and data records to unscaled arrays
+
+    Args:
+        buf (bytes): content of an IGRAv2 file
+        all_columns (bool): return all columns or just data
+        start (str, datetime): first date to read
+        end (str, datetime): last date to read
+        variables (list): decode only these columns, pres is always read
+
+    Returns:
+        dict : header arrays (date, numlev, (p_src, np_src), lat, lon as integer)
+        dict : data record arrays (integer, flags as uint8 characters)
+        ndarray : sounding of each data record
+        int : number of lines
+    """
+    import numpy as np
+    import pandas as pd
+
+    if start is not None or end is not None:
+        offsets, ends = _igra_header_offsets(buf)
+        dates = _igra_header_dates(_igra_header_lines(buf, offsets))
+        select = np.ones(dates.size, dtype=bool)
+        if start is not None:
+            select &= dates >= pd.Timestamp(start).to_datetime64()
+        if end is not None:
+            select &= dates <= pd.Timestamp(end).to_datetime64()
+        if not select.all():
+            buf = b''.join([buf[i:j] for i, j in zip(offsets[select], ends[select])])
+
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    starts, lengths = _line_offsets(raw)
+    ishead = raw[starts] == ord('#')
+    #
+    # Header
+    #
+    headers = _igra_header_columns(_fixed_width(raw, starts[ishead], lengths[ishead], 71), all_columns=all_columns,
+                                   scale=False)
+    #
+    # Data, sounding of the previous header
+    #
+    isound = np.cumsum(ishead) - 1
+    idata = ~ishead & (isound >= 0)
+    record = [i for i in _igra_record if (all_columns or not i[4]) and (variables is None or i[0] in variables
+                                                                         or i[0] == 'pres')]
+    # only the characters of selected columns
+    lines = _fixed_width(raw, starts[idata], lengths[idata], max(i[2] for i in record))
+    columns = {}
+    for ivar, a, b, scale, extra in record:
+        if scale is None:
+            columns[ivar] = lines[:, a]
+        else:
+            columns[ivar] = _decode_int(lines, a, b)
+    return headers, columns, isound[idata], starts.size
+
+
+def _missing(values, missing):
+    """ Replace missing values with NaN, integers become float only if required
+
+    Args:
+        values (ndarray): values
+        missing (list): missing values
+
+    Returns:
+        ndarray : values
+    """
+    import numpy as np
+    mask = np.isin(values, missing)
+    if mask.any():
+        return np.where(mask, np.nan, values)
+    return values
+
+
+def _igra_header_offsets(buf):
+    """ Byte offsets of IGRAv2 soundings, data records are jumped over by NUMLEV
+
+    Args:
+        buf (bytes): content of an IGRAv2 file
+
+    Returns:
+        ndarray : start offsets of header lines
+        ndarray : end offsets of soundings
+    """
+    import numpy as np
+    n = len(buf)
+    offsets = []
+    pos = 0
+    width = None  # data records have a fixed width
+    while pos < n:
+        if buf[pos] != 35:
+            return _igra_header_offsets_mask(buf)  # NUMLEV and records disagree
+
+        offsets.append(pos)
+        eol = buf.find(b'\n', pos)
+        if eol == -1:
+            break
+        numlev = int(buf[pos + 32:pos + 36])
+        pos = eol + 1
+        if numlev == 0:
+            continue
+
+        if width is None:
+            width = buf.find(b'\n', pos) + 1 - pos
+        jump = pos + numlev * width
+        if width > 0 and jump <= n and buf[jump - 1] == 10 and (jump == n or buf[jump] == 35):
+            pos = jump
+        else:
+            for _ in range(numlev):
+                eol = buf.find(b'\n', pos)
+                pos = n if eol == -1 else eol + 1
+    offsets = np.array(offsets, dtype=np.int64)
+    return offsets, np.append(offsets[1:], n)
+
+
+def _igra_header_offsets_mask(buf):
+    """ Byte offsets of IGRAv2 soundings from lines starting with #
+
+    Args:
+        buf (bytes): content of an IGRAv2 file
+
+    Returns:
+        ndarray : start offsets of header lines
+        ndarray : end offsets of soundings
+    """
+    import numpy as np
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    starts, lengths = _line_offsets(raw)
+    offsets = starts[raw[starts] == ord('#')]
+    return offsets, np.append(offsets[1:], len(buf))
+
+
+def _igra_header_lines(buf, offsets):
+    """ Fixed-width character array of IGRAv2 header lines
+
+    Args:
+        buf (bytes): content of an IGRAv2 file
+        offsets (ndarray): start offsets of header lines
+
+    Returns:
+        ndarray : (headers, 71) uint8 array
+    """
+    import numpy as np
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    lengths = np.array([buf.find(b'\n', i) for i in offsets], dtype=np.int64)
+    lengths = np.where(lengths == -1, len(buf), lengths) - offsets
+    return _fixed_width(raw, offsets, lengths, 71)
+
+
+def _line_offsets(raw):
+    """ Start and length of every non-empty line in a byte array
+
+    Args:
+        raw (ndarray): uint8 array of file content
+
+    Returns:
+        ndarray : start offsets
+        ndarray : line lengths (without newline)
+    """
+    import numpy as np
+    ends = np.flatnonzero(raw == 10)
+    if raw.size > 0 and raw[-1] != 10:
+        ends = np.append(ends, raw.size)  # no newline at the end
+    starts = np.zeros_like(ends)
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts
+    # windows line endings
+    lengths -= (lengths > 0) & (raw[np.maximum(ends - 1, 0)] == 13)
+    valid = lengths > 0
+    return starts[valid], lengths[valid]
+
+
+def _fixed_width(raw, starts, lengths, width):
+    """ Copy lines into a fixed-width character array, padded with blanks
+
+    Args:
+        raw (ndarray): uint8 array of file content
+        starts (ndarray): start offsets of lines
+        lengths (ndarray): lengths of lines
+        width (int): number of characters
+
+    Returns:
+        ndarray : (lines, width) uint8 array
+    """
+    import numpy as np
+    out = np.full((starts.size, width), 32, dtype=np.uint8)
+    inside = starts + width <= raw.size
+    if raw.size >= width:
+        out[inside] = np.lib.stride_tricks.sliding_window_view(raw, width)[starts[inside]]
+    for i in np.flatnonzero(~inside):
+        out[i, :raw.size - starts[i]] = raw[starts[i]:]  # end of file
+    short = lengths < width
+    if short.any():
+        out[short] = np.where(np.arange(width) < lengths[short, None], out[short], 32)
+    return out
+
+
+def _decode_int(chars, a, b, missing=False):
+    """ Decode an integer field from a fixed-width character array
+
+    Args:
+        chars (ndarray): (lines, width) uint8 array
+        a (int): first column
+        b (int): last column (exclusive)
+        missing (bool): blank fields are NaN (float64, if there are any) instead of an error
+
+    Returns:
+        ndarray : int64 values, blanks around the digits are ignored
+
+    Raises:
+        ValueError : for characters other than digits, blanks and signs or without digits (like int)
+    """
+    import numpy as np
+    field = np.ascontiguousarray(chars[:, a:b].T)
+    digits = field - np.uint8(48)
+    other = (digits >= 10) & (field != 32) & (field != 45) & (field != 43)
+    if other.any():
+        i = np.flatnonzero(other.any(axis=0))[0]
+        raise ValueError("invalid literal for int(): %r" % field[:, i].tobytes().decode('latin-1'))
+    value = np.zeros(field.shape[1], dtype=np.int64)
+    for digit in digits:
+        value = np.where(digit < 10, value * 10 + digit, value)
+    value = np.where((field == 45).any(axis=0), -value, value)
+    blank = ~(digits < 10).any(axis=0)
+    if blank.any():
+        if not missing:
+            i = np.flatnonzero(blank)[0]
+            raise ValueError("invalid literal for int(): %r" % field[:, i].tobytes().decode('latin-1'))
+        value = np.where(blank, np.nan, value)
+    return value
+
+
+def _decode_float(chars, a, b):
+    """ Decode a real field from a fixed-width character array
+
+    Args:
+        chars (ndarray): (lines, width) uint8 array
+        a (int): first column
+        b (int): last column (exclusive)
+
+    Returns:
+        ndarray : float64 values, blanks are NaN
+    """
+    import numpy as np
+    field = np.ascontiguousarray(chars[:, a:b]).view('S%d' % (b - a)).ravel()
+    blank = (chars[:, a:b] == 32).all(axis=1)
+    values = np.full(field.size, np.nan)
+    values[~blank] = field[~blank].astype(float)
+    return values
+
+
+def _decode_str(chars, a, b, strip=True):
+    """ Decode a character field from a fixed-width character array
+
+    Args:
+        chars (ndarray): (lines, width) uint8 array
+        a (int): first column
+        b (int): last column (exclusive)
+        strip (bool): remove blanks
+
+    Returns:
+        ndarray : object array of str
+    """
+    import numpy as np
+    if chars.shape[0] == 0:
+        return np.array([], dtype=object)
+    field = np.ascontiguousarray(chars[:, a:b]).view('S%d' % (b - a)).ravel()
+    field = np.char.decode(field, 'utf-8')
+    if strip:
+        field = np.char.strip(field)
+    return field.astype(object)
+
+
+def _igra_header_columns(head, all_columns=False, scale=True):
+    """ Decode IGRAv2 header lines
+
+    Args:
+        head (ndarray): (headers, width) uint8 array
+        all_columns (bool): include data source codes
+        scale (bool): lat, lon in degrees or as integer
+
+    Returns:
+        dict : date, numlev, (p_src, np_src), lat, lon arrays
+    """
+    headers = {'date': _igra_header_dates(head), 'numlev': _decode_int(head, 32, 36)}
+    if all_columns:
+        headers['p_src'] = _decode_str(head, 37, 45)
+        headers['np_src'] = _decode_str(head, 46, 54)
+    headers['lat'] = _decode_int(head, 55, 62)
+    headers['lon'] = _decode_int(head, 63, 71)
+    if scale:
+        headers['lat'] = headers['lat'] / 10000.
+        headers['lon'] = headers['lon'] / 10000.
+    return headers
 
+
+def _igra_header_dates(head):
+    """ Sounding dates from IGRAv2 header lines
+
+    Uses the nominal hour, or the release time if the hour is missing (99),
+    remaining 99 are replaced by 00.
+
+    Args:
+        head (ndarray): (headers, width) uint8 array
+
+    Returns:
+        ndarray : datetime64[ns]
+    """
+    import numpy as np
+    hour = _decode_int(head, 24, 26)
+    time = np.full((head.shape[0], 6), ord('0'), dtype=np.uint8)
+    time[:, :4] = np.where((hour == 99)[:, None], head[:, 27:31], time[:, :4])
+    time[:, :2] = np.where((hour == 99)[:, None], time[:, :2], head[:, 24:26])
+    # wired stuff !? (same as str.replace('99', '00'))
+    for i in range(5):
+        match = (time[:, i] == ord('9')) & (time[:, i + 1] == ord('9'))
+        time[match, i:i + 2] = ord('0')
+    return _to_datetime64(_decode_int(head, 13, 17), _decode_int(head, 18, 20), _decode_int(head, 21, 23),
+                          _decode_int(time, 0, 2), _decode_int(time, 2, 4), _decode_int(time, 4, 6))
+
+
+def _to_datetime64(year, month, day, hour=0, minute=0, second=0):
+    """ Build dates from integer arrays with datetime64 arithmetic
+
+    Args:
+        year (ndarray): year
+        month (ndarray): month
+        day (ndarray): day
+        hour (ndarray): hour
+        minute (ndarray): minute
+        second (ndarray): second
+
+    Returns:
+        ndarray : datetime64[ns]
+
+    Raises:
+        ValueError : for invalid dates
+    """
+    import numpy as np
+    months = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+    days = months.astype('datetime64[D]') + (day - 1)
+    seconds = np.asarray(hour * 3600 + minute * 60 + second, dtype=np.int64)
+    valid = _valid_datetime(year, month, day, hour, minute, second)
+    if not np.all(valid):
+        i = np.flatnonzero(~np.broadcast_to(valid, np.shape(months)))[0]
+        raise ValueError("Invalid date: %04d-%02d-%02d %02d:%02d:%02d" % tuple(
+            np.broadcast_to(j, np.shape(months))[i] for j in (year, month, day, hour, minute, second)))
+    return (days.astype('datetime64[s]') + seconds.astype('timedelta64[s]')).astype('datetime64[ns]')
+
+
+def _valid_datetime(year, month, day, hour=0, minute=0, second=0):
+    """ Dates that can be built from integer arrays (see _to_datetime64)
+
+    Returns:
+        ndarray : valid or not
+    """
+    import numpy as np
+    months = ((year - 1970) * 12 + np.clip(month, 1, 12) - 1).astype('datetime64[M]')
+    days = months.astype('datetime64[D]') + (day - 1)
+    valid = (month >= 1) & (month <= 12) & (day >= 1) & (days.astype('datetime64[M]') == months)
+    valid &= (hour >= 0) & (hour < 24) & (minute >= 0) & (minute < 60) & (second >= 0) & (second < 62)
+    return valid
+
+
+def metadata(filename):
+    """ Read IGRAv2 _metadata file according to readme
+
+    igra2-_metadata-readme.txt
+
+    Documentation for IGRA Station History Information
+    Accompanying IGRA Version 2.0.0b1
+    August 2014
+
+    Args:
+        filename (str):  igra2-_metadata.txt
+
+    Returns:
+        DataFrame
+    """
     infos = """IGRAID         1- 11   Character
 WMOID         13- 17   Integer
 NAME          19- 48   Character
@@ -656,35 +2007,43 @@ UPDCOM       316-346   Character
 UPDDATE      348-354   Character
 """
 
-    colspecs = []
-    header = []
-    types = {}
+    return _cached(filename, _metadata_table, infos)
+
+
+def _metadata_table(filename, infos):
+    """ Bulk fixed-width decoding of the IGRAv2 metadata file
+
+    Args:
+        filename (str): igra2-metadata.txt
+        infos (str): column descriptions
+
+    Returns:
+        DataFrame
+    """
+    import numpy as np
+    import pandas as pd
+
+    chars = _read_fixed_width(filename)
+    data = {}
     for iline in infos.splitlines():
         if iline == '':
             continue
         ih = iline[0:11].strip().lower()
-        header.append(ih)
         ii = int(iline[13:16]) - 1
         ij = int(iline[17:20])
-        colspecs.append((ii, ij))
         it = iline[22:].strip()
         if it == 'Character':
-            it = 'str'
-
+            data[ih] = _decode_str(chars, ii, ij)
         elif it == 'Real':
-            it = 'float'
-
+            data[ih] = _decode_float(chars, ii, ij)
         else:
-            it = 'int'
-
-        types[ih] = it
+            data[ih] = _decode_int(chars, ii, ij, missing=ih not in ('year', 'month', 'day', 'hour'))
 
-    data = pd.read_fwf(filename, colspecs=colspecs, header=None, dtype=types, names=header)
-    data = data.replace('nan', '')
-    data['date'] = pd.to_datetime((data.year * 1000000 +
-                                   np.where(data.month.values == 99, 6, data.month.values) * 10000 +
-                                   np.where(data.day.values == 99, 15, data.day.values) * 100 +
-                                   np.where(data.hour.values == 99, 0, data.hour.values)).apply(str), format='%Y%m%d%H')
+    data = pd.DataFrame(data)
+    data['date'] = _to_datetime64(data.year.values,
+                                  np.where(data.month.values == 99, 6, data.month.values),
+                                  np.where(data.day.values == 99, 15, data.day.values),
+                                  np.where(data.hour.values == 99, 0, data.hour.values))
     return data
 
 
@@ -699,51 +2058,89 @@ def stationlist(filename, verbose=1):
         DataFrame : station informations
     """
     from .support import message
-    import numpy as np
-    import pandas as pd
 
     try:
-        infile = open(filename)
-        tmp = infile.read()
-        data = tmp.splitlines()
+        out = _cached(filename, _stationlist_table)
         message("Data read from:", filename, verbose=verbose)
     except IOError as e:
         message("File not found: " + filename, verbose=verbose)
         raise e
-    else:
-        infile.close()
 
-    out = pd.DataFrame(columns=['id', 'wmo', 'lat', 'lon', 'alt', 'state', 'name', 'start', 'end', 'total'])
+    message("Data processed", len(out) - 1, verbose=verbose)
+    return out
 
-    for i, line in enumerate(data):
-        id = line[0:11]
 
-        try:
-            id2 = "%06d" % int(line[5:11])  # substring
+def _stationlist_table(filename):
+    """ Bulk fixed-width decoding of the IGRAv2 station list
 
-        except ValueError:
-            id2 = ""
-
-        lat = float(line[12:20])
-        lon = float(line[21:30])
-        alt = float(line[31:37])
-        state = line[38:40]
-        name = line[41:71]
-        start = int(line[72:76])
-        end = int(line[77:81])
-        count = int(line[82:88])
-        out.loc[i] = (id, id2, lat, lon, alt, state, name, start, end, count)
-
-    message("Data processed", i, verbose=verbose)
+    Args:
+        filename (str): filename of station list
+
+    Returns:
+        DataFrame : station informations
+    """
+    import numpy as np
+    import pandas as pd
+
+    chars = _read_fixed_width(filename)
+    wmo = pd.Series(_decode_str(chars, 5, 11, strip=False))
+    valid = wmo.str.fullmatch(r'\s*[+-]?\d+\s*').values
+    wmo[valid] = wmo[valid].astype(int).astype(str).str.zfill(6)  # substring
+    wmo[~valid] = ""
+    out = pd.DataFrame({'id': _decode_str(chars, 0, 11, strip=False),
+                        'wmo': wmo.values.astype(object),
+                        'lat': _decode_float(chars, 12, 20),
+                        'lon': _decode_float(chars, 21, 30),
+                        'alt': _decode_float(chars, 31, 37),
+                        'state': _decode_str(chars, 38, 40, strip=False),
+                        'name': _decode_str(chars, 41, 71),
+                        'start': _decode_int(chars, 72, 76, missing=True),
+                        'end': _decode_int(chars, 77, 81, missing=True),
+                        'total': _decode_int(chars, 82, 88, missing=True)})
     out.loc[out.lon <= -998.8, 'lon'] = np.nan  # repalce missing values
     out.loc[out.alt <= -998.8, 'alt'] = np.nan  # repalce missing values
     out.loc[out.lat <= -98.8, 'lat'] = np.nan  # replace missing values
-    out['name'] = out.name.str.strip()
     out = out.set_index('id')
     return out
 
 
-def uadb_ascii_to_dataframe(filename, **kwargs):
+_tables = {}
+
+
+def _cached(filename, reader, *args):
+    """ Parse a file once per process, as long as its size and modification time do not change
+
+    Args:
+        filename (str): filename
+        reader (callable): reader(filename, *args) returning a DataFrame
+
+    Returns:
+        DataFrame : copy of the cached table
+    """
+    import os
+    info = os.stat(filename)
+    key = (reader.__name__, os.path.abspath(filename))
+    if key not in _tables or _tables[key][0] != (info.st_size, info.st_mtime_ns):
+        _tables[key] = ((info.st_size, info.st_mtime_ns), reader(filename, *args))
+    return _tables[key][1].copy()
+
+
+def _read_fixed_width(filename):
+    """ Read a text file into a fixed-width character array
+
+    Args:
+        filename (str): filename
+
+    Returns:
+        ndarray : (lines, width) uint8 array
+    """
+    import numpy as np
+    raw = np.frombuffer(_read_ascii(filename), dtype=np.uint8)
+    starts, lengths = _line_offsets(raw)
+    return _fixed_width(raw, starts, lengths, int(lengths.max()) if lengths.size else 0)
+
+
+def uadb_ascii_to_dataframe(filename, engine='numpy', **kwargs):
     """ NCAR Upper Air Database
     This data is output from the NCAR Upper Air Database Project (UADB). The Composited
     UADB products (UADB-TRH,UADB-Wind) and Combined (UADB-TRHC,UADB-WindC)
@@ -756,40 +2153,45 @@ def uadb_ascii_to_dataframe(filename, **kwargs):
 
     Args:
         filename (str): filename
+        engine (str): numpy (vectorized) or python (line by line reference)
         **kwargs:
 
     Returns:
 
     """
-    import datetime
-    import zipfile
-    import gzip
     import os
-    import io
-    import numpy as np
-    import pandas as pd
     from . import support as sp
 
     if not os.path.isfile(filename):
         raise IOError("File not Found! %s" % filename)
 
-    if '.zip' in filename:
-        archive = zipfile.ZipFile(filename, 'r')
-        inside = archive.namelist()
-        tmp = archive.open(inside[0])
-        tmp = io.TextIOWrapper(tmp, encoding='utf-8')
-        tmp = tmp.read()
-        archive.close()
-        data = tmp.splitlines()  # Memory (faster)
-    elif '.gz' in filename:
-
-        with gzip.open(filename, 'rt', encoding='utf-8') as infile:
-            tmp = infile.read()  # alternative readlines (slower)
-            data = tmp.splitlines()  # Memory (faster)
+    if engine == 'numpy':
+        data, headers, nlines, nmiss = _uadb_parse_numpy(_read_ascii(filename), **kwargs)
+    elif engine == 'python':
+        data, headers, nlines, nmiss = _uadb_parse_python(_read_ascii(filename).decode('utf-8').splitlines(),
+                                                          **kwargs)
     else:
-        with open(filename, 'rt') as infile:
-            tmp = infile.read()  # alternative readlines (slower)
-            data = tmp.splitlines()  # Memory (faster)
+        raise ValueError("Unknown engine: %s (numpy, python)" % engine)
+    sp.message("UADB Lines read:", nlines - 1, "skipped:", nmiss, "Header:", len(headers), **kwargs)
+    return data, headers
+
+
+def _uadb_parse_python(data, **kwargs):
+    """ UADB parser, line by line
+
+    Args:
+        data (list): lines of an UADB file
+        **kwargs:
+
+    Returns:
+        DataFrame : Table of radiosonde soundings
+        DataFrame : Station Information
+        int : number of lines
+        int : number of skipped lines
+    """
+    import datetime
+    import numpy as np
+    import pandas as pd
 
     raw = []
     headers = []
@@ -869,8 +2271,6 @@ def uadb_ascii_to_dataframe(filename, **kwargs):
             raw.append((press, gph, temp, rh, wdir, wspd))
             dates.append(idate)
 
-    sp.message("UADB Lines read:", i, "skipped:", nmiss, "Header:", len(headers), **kwargs)
-
     out = pd.DataFrame(data=raw, index=dates, columns=['pres', 'gph', 'temp', 'rhumi', 'windd', 'winds'])
     out = out.replace([-999.9, -9999, -999, -999.0, -99999.0, -99999.9], np.nan)
     # fix units
@@ -878,33 +2278,197 @@ def uadb_ascii_to_dataframe(filename, **kwargs):
     out.index.name = 'date'
     headers = pd.DataFrame(data=headers, columns=['date', 'uid', 'numlev', 'lat', 'lon', 'alt', 'stype']).set_index(
         'date')
-    return out, headers
+    return out, headers, len(data), nmiss
+
+
+# UADB header record: name, columns, type (parsed like int() / float())
+_uadb_header = [('uid', 2, 14, int), ('idflag', 22, 24, int), ('d_src', 25, 28, int), ('version', 29, 34, float),
+                ('dateflag', 35, 37, int), ('month', 43, 45, int), ('day', 46, 48, int), ('locflag', 54, 56, int),
+                ('lat', 57, 67, float), ('lon', 68, 78, float), ('alt', 79, 85, float), ('stype', 86, 88, int),
+                ('numlev', 89, 93, int)]
+
+# UADB data record: name, columns
+_uadb_record = [('pres', 5, 13), ('gph', 14, 22), ('temp', 23, 29), ('rhumi', 30, 36), ('windd', 37, 43),
+                ('winds', 44, 50)]
+
 
+def _uadb_parse_numpy(buf, **kwargs):
+    """ Vectorized UADB parser, same results as _uadb_parse_python
 
-def dataframe_to_array(data, dim='time', plev='plev', levels=None):
+    Header lines are found in one scan, all fields are decoded column-wise and
+    blocks with an invalid header (or day 99) are dropped with their data records.
+
+    Args:
+        buf (bytes): content of an UADB file
+        **kwargs:
+
+    Returns:
+        DataFrame : Table of radiosonde soundings
+        DataFrame : Station Information
+        int : number of lines
+        int : number of skipped lines
+    """
+    import numpy as np
+    import pandas as pd
+    from . import support as sp
+
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    starts, lengths = _line_offsets(raw)
+    ishead = raw[starts] == ord('H')
+    isound = np.cumsum(ishead) - 1  # block of every line, -1 before the first header
+    #
+    # Header
+    #
+    head = _fixed_width(raw, starts[ishead], lengths[ishead], 94)
+    headers = {}
+    valid = np.ones(head.shape[0], dtype=bool)
+    for ivar, a, b, dtype in _uadb_header:
+        headers[ivar], ok = _decode_number(head, a, b, dtype)
+        valid &= ok
+    # day 99 blocks are skipped without notice
+    day = headers['day']
+    day99 = valid & np.array(['99' in "%2d" % i for i in day], dtype=bool).reshape(day.shape)
+    # year as %Y
+    year = head[:, 38:42] - np.uint8(48)
+    valid &= (year < 10).all(axis=1)
+    year = (year.astype(np.int64) * [1000, 100, 10, 1]).sum(axis=1)
+    # wired stuff !? (same as str.replace('99', '00'))
+    time = head[:, 49:53].copy()
+    for i in range(3):
+        match = (time[:, i] == ord('9')) & (time[:, i + 1] == ord('9'))
+        time[match, i:i + 2] = ord('0')
+    time, ok = _decode_number(time, 0, 4, int)
+    valid &= ok
+    hour, minute = time // 100, time % 100
+    minute = np.where((minute > 60) | (minute < 0), 0, np.where(minute == 60, 59, minute))
+    valid &= (year >= 1) & _valid_datetime(year, headers['month'], day, hour, minute)
+    for i in np.flatnonzero(~valid & ~day99):
+        line = bytes(head[i]).decode('utf-8', 'replace').rstrip()
+        sp.message("Error:", line, "Skipping Block:", **kwargs)
+        if kwargs.get('debug', False):
+            raise ValueError("Invalid UADB header: %s" % line)
+    valid &= ~day99
+    #
+    # Data
+    #
+    select = ~ishead & (isound >= 0)
+    select[select] = valid[isound[select]]
+    nmiss = int((~ishead).sum() - select.sum())
+    chars = _fixed_width(raw, starts[select], lengths[select], 50)
+    columns = {}
+    for ivar, a, b in _uadb_record:
+        field = np.ascontiguousarray(chars[:, a:b]).view('S%d' % (b - a)).ravel()
+        columns[ivar] = _missing(field.astype(float), [-999.9, -9999, -999, -999.0, -99999.0, -99999.9])
+    columns['pres'] = columns['pres'] * 100.  # need Pa
+    dates = np.full(head.shape[0], np.datetime64('NaT'), dtype='datetime64[ns]')
+    dates[valid] = _to_datetime64(year[valid], headers['month'][valid], day[valid], hour[valid], minute[valid])
+    out = pd.DataFrame(columns, index=pd.DatetimeIndex(dates[isound[select]]))
+    out.index.name = 'date'
+    headers = pd.DataFrame({'date': dates[valid], 'uid': headers['uid'][valid], 'numlev': headers['numlev'][valid],
+                            'lat': headers['lat'][valid], 'lon': headers['lon'][valid], 'alt': headers['alt'][valid],
+                            'stype': headers['stype'][valid]}).set_index('date')
+    return out, headers, starts.size, nmiss
+
+
+def _decode_number(chars, a, b, dtype=float):
+    """ Decode a field like int() / float() from a fixed-width character array
+
+    Args:
+        chars (ndarray): (lines, width) uint8 array
+        a (int): first column
+        b (int): last column (exclusive)
+        dtype (type): int or float
+
+    Returns:
+        ndarray : values, 0 where invalid
+        ndarray : valid or not (blank or not a number)
+    """
+    import numpy as np
+    field = np.ascontiguousarray(chars[:, a:b]).view('S%d' % (b - a)).ravel()
+    try:
+        return field.astype(dtype), np.ones(field.size, dtype=bool)
+    except ValueError:
+        pass
+    # only for broken records
+    values = np.zeros(field.size, dtype=dtype)
+    valid = np.ones(field.size, dtype=bool)
+    for i, value in enumerate(field):
+        try:
+            values[i] = dtype(value)
+        except ValueError:
+            valid[i] = False
+    return values, valid
+
+
+def dataframe_to_array(data, dim='time', plev='plev', levels=None, duplicates='first'):
+    """ Convert a table of profiles to 2d arrays (dim, plev)
+
+    Rows on levels are scattered directly into preallocated (dates, levels) arrays.
+    Only levels present in the table become coordinates, as well as dates with data.
+
+    Args:
+        data (Dataset): table with dimension dim and plev as variable
+        dim (str): date dimension
+        plev (str): pressure variable
+        levels (list): pressure levels to keep
+        duplicates (str): same date and level: first, last, mean (first for flags) or raise
+
+    Returns:
+        Dataset : variables (dim, plev)
+    """
+    import numpy as np
+    import xarray as xr
     from . import std_plevels
 
     if levels is None:
         levels = std_plevels
 
-    # copy attributes
-    attrs = data.attrs.copy()
-    tatts = data[dim].attrs
-    vatt = {i: data[i].attrs.copy() for i in data.data_vars}
-    # dimensions for output
-    varis = [dim, plev]
-    # to pandas dataframe
-    data = data.to_dataframe()
+    if duplicates not in ('first', 'last', 'mean', 'raise'):
+        raise ValueError("Unknown duplicates: %s (first, last, mean, raise)" % duplicates)
+
     # select only valid levels
-    data = data[data[plev].isin(levels)]
-    # convert to xarray
-    data = data.reset_index().set_index(varis)
-    if not data.index.is_unique:
-        data = data.loc[~data.index.duplicated()]  # remove duplicated
-    data = data.to_xarray()  # 1D -> 2D
-    # add attributes again
-    for i, j in vatt.items():
-        data[i].attrs.update(j)
-    data.attrs.update(attrs)
-    data[dim].attrs.update(tatts)
-    return data
+    pres = data[plev].values
+    ilev = np.isin(pres, levels)
+    rows = np.flatnonzero(ilev)
+    plevs, ilev = np.unique(pres[rows], return_inverse=True)
+    dates, idate = np.unique(data[dim].values[rows], return_inverse=True)
+    # position in (dim, plev), sorted (stable)
+    flat = idate * plevs.size + ilev
+    if flat.size > 1 and (np.diff(flat) < 0).any():
+        order = np.argsort(flat, kind='stable')
+        rows, flat = rows[order], flat[order]
+    unique = np.ones(flat.size, dtype=bool)
+    unique[1:] = flat[1:] != flat[:-1]
+    if duplicates == 'raise' and not unique.all():
+        raise ValueError("Duplicated %s and %s: %d" % (dim, plev, (~unique).sum()))
+    if duplicates == 'last':
+        keep = np.append(unique[1:], True)
+    else:
+        keep = unique  # mean: first for flags and non-numeric
+    size = dates.size * plevs.size
+    full = keep.sum() == size
+
+    out = xr.Dataset(coords={dim: (dim, dates, data[dim].attrs), plev: (plev, plevs, data[plev].attrs)})
+    for ivar in list(data.coords) + list(data.data_vars):
+        if ivar in (dim, plev):
+            continue
+        values = data[ivar].values[rows]
+        if duplicates == 'mean' and values.dtype.kind in 'iuf' and not ivar.startswith('flag_'):
+            valid = np.isfinite(values)
+            counts = np.bincount(flat[valid], minlength=size)
+            sums = np.bincount(flat[valid], weights=values[valid], minlength=size)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                array = sums / counts
+        else:
+            if full:
+                array = np.empty(size, dtype=values.dtype)
+            elif values.dtype.kind in 'Mm':
+                array = np.full(size, np.datetime64('NaT'), dtype=values.dtype)
+            elif values.dtype.kind in 'fcO':
+                array = np.full(size, np.nan, dtype=values.dtype)
+            else:
+                array = np.full(size, np.nan)
+            array[flat[keep]] = values[keep]
+        out[ivar] = ((dim, plev), array.reshape(dates.size, plevs.size), data[ivar].attrs)
+    out.attrs.update(data.attrs)
+    return out
@@ -1,13 +1,24 @@
+import http.server
 import os
+import shutil
+import threading
 import unittest
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 import xarray as xr
 
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+
 import igra
 
 tmpdir = '/tmp/igra-test'
+datafile = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data',
+                        'AUM00011035-data.txt.gz')
 
 
 class DownloadTest(unittest.TestCase):
@@ -29,6 +40,146 @@ class DownloadTest(unittest.TestCase):
         self.assertTrue(os.path.isfile('%s/USM00072216-data-beg%s.txt.zip' % (tmpdir, iyear)))
 
 
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """ Local stand-in for the IGRA server (Range and conditional requests, broken transfers) """
+    protocol_version = 'HTTP/1.1'
+    directory = None
+    broken = set()  # send only half of these paths, once
+    misplaced = set()  # answer a Range request of these paths from the start, once
+    requests = []
+    codes = []  # status of the responses
+
+    def send_response(self, code, message=None):
+        self.codes.append(code)
+        super().send_response(code, message)
+
+    def do_HEAD(self):
+        self.do_GET(body=False)
+
+    def do_GET(self, body=True):
+        self.requests.append((self.command, self.path, dict(self.headers)))
+        filename = os.path.join(self.directory, os.path.basename(self.path))
+        if not os.path.isfile(filename):
+            self.send_error(404)
+            return
+        with open(filename, 'rb') as f:
+            content = f.read()
+        etag = '"%d-%d"' % (len(content), os.stat(filename).st_mtime_ns)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        start = 0
+        if 'Range' in self.headers and self.headers.get('If-Range', etag) == etag:
+            start = int(self.headers['Range'].split('=')[1].split('-')[0])
+            if self.path in self.misplaced:
+                self.misplaced.discard(self.path)
+                start = 0
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, len(content) - 1, len(content)))
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(content) - start))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        if not body:
+            return
+        if self.path in self.broken:
+            self.broken.discard(self.path)
+            self.wfile.write(content[start:start + (len(content) - start) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(content[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class ServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        RangeHandler.directory = '%s/server' % tmpdir
+        os.makedirs(RangeHandler.directory, exist_ok=True)
+        for ident in ['AUM00011031', 'AUM00011032']:
+            shutil.copy(datafile, '%s/%s-data.txt.zip' % (RangeHandler.directory, ident))
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        cls.url = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        shutil.rmtree('%s/download' % tmpdir, ignore_errors=True)
+        RangeHandler.requests.clear()
+
+    def test_stations(self):
+        RangeHandler.broken.add('/AUM00011032-data.txt.zip')
+        files, errors = igra.download.stations(['AUM00011031', 'AUM00011032', 'AUM00099999'],
+                                               '%s/download' % tmpdir, server=self.url, workers=2, backoff=0.01)
+        self.assertEqual(sorted(files.keys()), ['AUM00011031', 'AUM00011032'])
+        self.assertEqual(list(errors.keys()), ['AUM00099999'])
+        for ifile in files.values():
+            with open(ifile, 'rb') as f, open(datafile, 'rb') as g:
+                self.assertEqual(f.read(), g.read())
+        self.assertFalse(any(i.endswith('.part') for i in os.listdir('%s/download' % tmpdir)))
+        resumed = [i[2] for i in RangeHandler.requests if i[1] == '/AUM00011032-data.txt.zip']
+        self.assertIn('Range', resumed[-1])
+        self.assertIn('If-Range', resumed[-1])
+
+    def test_stations_resume_changed(self):
+        directory = '%s/download' % tmpdir
+        os.makedirs(directory)
+        with open(datafile, 'rb') as f:
+            content = f.read()
+        # partial file of an older version on the server, with and without validator
+        for ident in ['AUM00011031', 'AUM00011032']:
+            with open('%s/%s-data.txt.zip.part' % (directory, ident), 'wb') as f:
+                f.write(b'x' * (len(content) // 2))
+        with open('%s/AUM00011031-data.txt.zip.part.json' % directory, 'w') as f:
+            f.write('{"etag": "\\"old\\"", "last_modified": null}')
+        files, errors = igra.download.stations(['AUM00011031', 'AUM00011032'], directory, server=self.url)
+        for ifile in files.values():
+            with open(ifile, 'rb') as f:
+                self.assertEqual(f.read(), content)
+        self.assertEqual(sorted(os.listdir(directory)), ['AUM00011031-data.txt.zip', 'AUM00011032-data.txt.zip',
+                                                         'igra-manifest.json'])
+        # Content-Range does not continue the partial file
+        shutil.rmtree(directory)
+        RangeHandler.broken.add('/AUM00011031-data.txt.zip')
+        RangeHandler.misplaced.add('/AUM00011031-data.txt.zip')
+        files, errors = igra.download.stations(['AUM00011031'], directory, server=self.url, backoff=0.01)
+        with open(files['AUM00011031'], 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+    def test_stations_not_modified(self):
+        directory = '%s/download' % tmpdir
+        igra.download.stations(['AUM00011031', 'AUM00011032'], directory, server=self.url, workers=2)
+        self.assertTrue(os.path.isfile(directory + '/igra-manifest.json'))
+        RangeHandler.requests.clear()
+        files, errors = igra.download.stations(['AUM00011031', 'AUM00011032'], directory, server=self.url)
+        self.assertEqual(len(files), 2)
+        self.assertEqual(len(errors), 0)
+        self.assertTrue(all('If-None-Match' in i[2] for i in RangeHandler.requests))
+        # changed on the server
+        os.utime('%s/AUM00011031-data.txt.zip' % RangeHandler.directory, ns=(0, 0))
+        RangeHandler.requests.clear()
+        igra.download.stations(['AUM00011031', 'AUM00011032'], directory, server=self.url)
+        self.assertEqual(len(RangeHandler.requests), 2)
+        # changed on the server, forced download updates the manifest
+        os.utime('%s/AUM00011031-data.txt.zip' % RangeHandler.directory, ns=(1, 1))
+        RangeHandler.requests.clear()
+        igra.download.stations(['AUM00011031', 'AUM00011032'], directory, server=self.url, force=True)
+        self.assertTrue(all('If-None-Match' not in i[2] for i in RangeHandler.requests))
+        RangeHandler.codes.clear()
+        files, errors = igra.download.stations(['AUM00011031', 'AUM00011032'], directory, server=self.url)
+        self.assertEqual(len(files), 2)
+        self.assertEqual(RangeHandler.codes, [304, 304])
+
+
 class ReadTest(unittest.TestCase):
     def test_stationlist_nofile(self):
         with self.assertRaises(IOError):
@@ -38,6 +189,39 @@ class ReadTest(unittest.TestCase):
         data = igra.read.stationlist('%s/igra2-station-list.txt' % tmpdir)
         self.assertIsInstance(data, pd.DataFrame)
 
+    def test_stationlist_ascii(self):
+        lines = ["ACM00078861  17.1170  -61.7830   10.0    COOLIDGE FIELD (UA)            1947 1993  13896",
+                 "ZZXUAICE002 -98.8888 -998.8888 -998.8    ICE ISLAND T-3                 1952 1953    284"]
+        os.makedirs(tmpdir, exist_ok=True)
+        with open('%s/test-station-list.txt' % tmpdir, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        data = igra.read.stationlist('%s/test-station-list.txt' % tmpdir)
+        self.assertEqual(list(data.index), ['ACM00078861', 'ZZXUAICE002'])
+        self.assertEqual(list(data.wmo), ['078861', ''])
+        self.assertEqual(data.loc['ACM00078861', 'name'], 'COOLIDGE FIELD (UA)')
+        self.assertTrue(data.loc['ZZXUAICE002', ['lat', 'lon', 'alt']].isna().all())
+        self.assertEqual(data.total.dtype, np.int64)
+        data.loc['ACM00078861', 'name'] = ''
+        self.assertEqual(igra.read.stationlist('%s/test-station-list.txt' % tmpdir).loc['ACM00078861', 'name'],
+                         'COOLIDGE FIELD (UA)')
+        # blank integer fields are missing
+        with open('%s/test-station-list-blank.txt' % tmpdir, 'w') as f:
+            f.write("\n".join(lines + [lines[0][:82] + ' ' * 6]) + "\n")
+        data = igra.read.stationlist('%s/test-station-list-blank.txt' % tmpdir)
+        self.assertEqual(list(data.total.isna()), [False, False, True])
+
+    def test_metadata_ascii(self):
+        line = [' '] * 354
+        for i, value in [(1, 'ACM00078861'), (13, '78861'), (85, '1990'), (90, '99'), (93, '99'), (96, '99')]:
+            line[i - 1:i - 1 + len(value)] = value
+        with open('%s/test-metadata.txt' % tmpdir, 'w') as f:
+            f.write("".join(line) + "\n" + "".join(line[:12] + [' '] * 5 + line[17:]) + "\n")
+        data = igra.read.metadata('%s/test-metadata.txt' % tmpdir)
+        self.assertEqual(data.wmoid.values[0], 78861)
+        self.assertTrue(np.isnan(data.wmoid.values[1]))
+        self.assertTrue(data.dateind.isna().all())
+        self.assertEqual(data.date.values[0], np.datetime64('1990-06-15'))
+
     def test_station(self):
         data, station = igra.read.igra('USM00072216', '%s/USM00072216-data.txt.zip' % tmpdir)
         self.assertIsInstance(data, xr.Dataset) and self.assertIsInstance(station, xr.Dataset)
@@ -46,10 +230,234 @@ class ReadTest(unittest.TestCase):
         data, station = igra.read.ascii_to_dataframe('%s/USM00072216-data.txt.zip' % tmpdir)
         self.assertIsInstance(data, pd.DataFrame) and self.assertIsInstance(station, pd.DataFrame)
 
+    def test_station_ascii_engine(self):
+        data, station = igra.read.ascii_to_dataframe(datafile, all_columns=True)
+        rdata, rstation = igra.read.ascii_to_dataframe(datafile, all_columns=True, engine='python')
+        pd.testing.assert_frame_equal(data, rdata)
+        pd.testing.assert_frame_equal(station, rstation)
+
+    def test_station_ascii_hours(self):
+        # missing hour (99) uses release time, remaining 99 are replaced
+        lines = ["#AUM00011035 2015 01 23 99 0999    1 ncdc-gts           482333   163500",
+                 "21 -9999  99200B-9999    38B-9999    22   300    50 ",
+                 "#AUM00011035 2015 01 24 99 2399    1 ncdc-gts           482333   163500",
+                 "21 -9999  99200B-9999    38B-9999    22   300    50 "]
+        os.makedirs(tmpdir, exist_ok=True)
+        with open('%s/hours-data.txt' % tmpdir, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        data, station = igra.read.ascii_to_dataframe('%s/hours-data.txt' % tmpdir)
+        rdata, rstation = igra.read.ascii_to_dataframe('%s/hours-data.txt' % tmpdir, engine='python')
+        pd.testing.assert_frame_equal(station, rstation)
+        self.assertEqual(station.index[1], pd.Timestamp('2015-01-24 23:00'))
+        # corrupt field and truncated line
+        for record in [lines[1].replace('99200', '9X200'), "20 -9999  97700 -9999 -9999 -9999 -9999   300"]:
+            with open('%s/hours-data.txt' % tmpdir, 'w') as f:
+                f.write("\n".join([lines[0], record]) + "\n")
+            for engine in ('numpy', 'python'):
+                with self.assertRaises(ValueError):
+                    igra.read.ascii_to_dataframe('%s/hours-data.txt' % tmpdir, engine=engine)
+
+    def test_station_uadb_engine(self):
+        # hour 99 and 60 minutes are fixed, day 99 and broken headers are skipped with their records
+        header = "H      8000000 011035  1  14   1.0  1 2015  1 %s %s  1    %7s    16.3600  200.0  3    2    1.0.0"
+        record = ["   1   992.00   -999.0    3.8 -999.0  300.0    5.0",
+                  "   1   850.00   1441.0   -1.5   45.0   20.0   10.0"]
+        lines = []
+        for day, hour, lat in [('23', '1200', '48.2500'), ('23', '1299', '48.2500'), ('24', '0660', '48.2500'),
+                               ('99', '0000', '48.2500'), ('25', '0000', 'xx.xxxx'), ('32', '0000', '48.2500')]:
+            lines += [header % (day, hour, lat)] + record
+        os.makedirs(tmpdir, exist_ok=True)
+        with open('%s/uadb_test.txt' % tmpdir, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        data, station = igra.read.uadb_ascii_to_dataframe('%s/uadb_test.txt' % tmpdir)
+        rdata, rstation = igra.read.uadb_ascii_to_dataframe('%s/uadb_test.txt' % tmpdir, engine='python')
+        pd.testing.assert_frame_equal(data, rdata, check_exact=True)
+        pd.testing.assert_frame_equal(station, rstation, check_exact=True)
+        self.assertEqual(list(station.index), [pd.Timestamp('2015-01-23 12:00'), pd.Timestamp('2015-01-23 12:00'),
+                                               pd.Timestamp('2015-01-24 06:59')])
+        self.assertEqual(len(data), 6)
+        self.assertEqual(data['pres'].iloc[1], 85000.)
+
+    def test_station_ascii_window(self):
+        data, station = igra.read.ascii_to_dataframe(datafile)
+        wdata, wstation = igra.read.ascii_to_dataframe(datafile, start='2015-03-01', end='2015-03-31')
+        rdata, rstation = igra.read.ascii_to_dataframe(datafile, start='2015-03-01', end='2015-03-31',
+                                                       engine='python')
+        select = (station.index >= '2015-03-01') & (station.index <= '2015-03-31')
+        pd.testing.assert_frame_equal(wstation, station[select])
+        pd.testing.assert_frame_equal(wdata, data[(data.index >= '2015-03-01') & (data.index <= '2015-03-31')])
+        pd.testing.assert_frame_equal(wdata, rdata)
+
+    def test_station_variables(self):
+        data, station = igra.read.ascii_to_dataframe(datafile)
+        tdata, tstation = igra.read.ascii_to_dataframe(datafile, variables=['temp'])
+        self.assertEqual(list(tdata.columns), ['pres', 'temp'])
+        pd.testing.assert_frame_equal(tdata, data[['pres', 'temp']], check_exact=True)
+        data, station = igra.read.igra('AUM00011035', datafile)
+        tdata, tstation = igra.read.igra('AUM00011035', datafile, variables='temp')
+        xr.testing.assert_identical(tdata, data[['temp']])
+        # not a column of the file: all columns are read
+        fdata, fstation = igra.read.igra('AUM00011035', datafile, variables=['flag_int'])
+        xr.testing.assert_identical(fdata, data[['flag_int']])
+        udata, ustation = igra.read.igra('AUM00011035', datafile, variables=['unknown'])
+        xr.testing.assert_identical(udata, data)
+
+    def test_station_derived(self):
+        data, station = igra.read.ascii_to_dataframe(datafile)
+        for method in ('bolton', 'magnus', 'foeewmo'):
+            hdata = igra.derived.humidity(data, method=method)
+            # relative humidity from dpd and back
+            rdata = igra.derived.humidity(hdata.assign(dpd=np.nan), variables=['dpd'], method=method)
+            np.testing.assert_allclose(rdata['dpd'], hdata['dpd'], atol=1e-9)
+            np.testing.assert_allclose(hdata['temp'] - hdata['dewp'], hdata['dpd'], atol=1e-9)
+        pdata, pstation = igra.read.igra('AUM00011035', datafile, derive=['dewp', 'shumi'])
+        vdata, vstation = igra.read.igra('AUM00011035', datafile, variables=['dewp', 'shumi'])
+        xr.testing.assert_identical(pdata[['dewp', 'shumi']], vdata)
+        self.assertEqual(vdata['dewp'].attrs['esat'], 'bolton')
+        np.testing.assert_allclose((pdata['temp'] - pdata['dewp']).values, pdata['dpd'].values, atol=1e-9)
+
+    def test_station_wind(self):
+        u, v = igra.derived.wind_to_uv(np.array([0., 90., 350.]), np.array([10., 5., 10.]))
+        np.testing.assert_allclose(u, [0., -5., 1.736482], atol=1e-6)
+        windd, winds = igra.derived.uv_to_wind(u, v)
+        np.testing.assert_allclose(windd, [0., 90., 350.])
+        # across north
+        data = pd.DataFrame({'pres': [90000., 80000., 70000.], 'windd': [350., 10., 20.], 'winds': [10., 10., 5.]},
+                            index=pd.DatetimeIndex(['2000-01-01'] * 3, name='date'))
+        data = igra.interp.dataframe(igra.derived.components(data), 'pres', levels=[85000.])
+        data = igra.read._wind_back(data)
+        self.assertTrue(data['windd'].iloc[2] > 355.)
+        self.assertEqual(data['windd'].iloc[3], 350.)
+        # reported values are kept
+        wdata, wstation = igra.read.igra('AUM00011035', datafile, variables=['windd', 'winds', 'u', 'v'])
+        self.assertEqual(wdata['u'].attrs['standard_name'], 'eastward_wind')
+        raw, station = igra.read.ascii_to_dataframe(datafile)
+        raw = raw[raw['pres'].isin(igra.std_plevels) & np.isfinite(raw['windd'])].reset_index()
+        raw = raw.drop_duplicates(['date', 'pres'])
+        values = wdata['windd'].sel(date=xr.DataArray(raw['date']), pres=xr.DataArray(raw['pres'])).values
+        np.testing.assert_array_equal(values, raw['windd'].values)
+
+    def test_station_hypsometric(self):
+        data, station = igra.read.ascii_to_dataframe(datafile)
+        both = np.flatnonzero(np.isfinite(data['pres'].values) & np.isfinite(data['gph'].values))[1::3]
+        test = data.copy()
+        test.iloc[both, test.columns.get_loc('pres')] = np.nan
+        test = igra.derived.hypsometric(test)
+        np.testing.assert_allclose(test['pres'].values[both], data['pres'].values[both], rtol=0.02)
+        self.assertTrue((test['flag_hyps'].values[both] == 1).all())
+        test = data.copy()
+        test.iloc[both, test.columns.get_loc('gph')] = np.nan
+        test = igra.derived.hypsometric(test.drop(columns='temp'))
+        np.testing.assert_allclose(test['gph'].values[both], data['gph'].values[both], rtol=0.05, atol=50)
+        self.assertTrue((test['flag_hyps'].values[both] == 6).all())  # standard atmosphere
+        hdata, hstation = igra.read.igra('AUM00011035', datafile, hypsometric=True)
+        cdata, cstation = igra.read.igra('AUM00011035', datafile, hypsometric=True, chunksize=100)
+        xr.testing.assert_identical(hdata, cdata)
+        self.assertEqual(hdata['flag_hyps'].attrs['standard_name'], 'flag_hypsometric')
+        # flags are not interpolated
+        for idata in (hdata, igra.read.igra('AUM00011035', datafile, hypsometric=True, return_table=True,
+                                            levels=igra.era_plevels)[0]):
+            flags = idata['flag_hyps'].values
+            self.assertTrue(np.isin(flags[np.isfinite(flags)], [0, 1, 2, 5, 6]).all())
+
+    def test_station_ascii_workers(self):
+        data, station = igra.read.ascii_to_dataframe(datafile, all_columns=True)
+        pdata, pstation = igra.read.ascii_to_dataframe(datafile, all_columns=True, workers=3)
+        pd.testing.assert_frame_equal(data, pdata, check_exact=True)
+        pd.testing.assert_frame_equal(station, pstation, check_exact=True)
+        data, station = igra.read.igra('AUM00011035', datafile)
+        pdata, pstation = igra.read.igra('AUM00011035', datafile, workers=3)
+        xr.testing.assert_identical(data, pdata)
+        xr.testing.assert_identical(station, pstation)
+
+    def test_station_ascii_compact(self):
+        data, station = igra.read.ascii_to_dataframe(datafile, all_columns=True)
+        compact = igra.read.ascii_to_compact(datafile, all_columns=True)
+        self.assertEqual(compact['temp'].encoding['dtype'], np.int16)
+        self.assertEqual(compact['tflag'].dtype, np.int8)
+        np.testing.assert_array_equal(compact['date'].values[compact['isound'].values], data.index.values)
+        np.testing.assert_array_equal(compact['pres'].values, data['pres'].values)
+        np.testing.assert_allclose(compact['temp'].values, data['temp'].values, rtol=1e-6)
+        np.testing.assert_allclose(compact['lat'].values, station['lat'].values)
+        flags = np.array([' ' if i == 'blank' else i for i in compact['tflag'].attrs['flag_meanings'].split()])
+        np.testing.assert_array_equal(flags[compact['tflag'].values], data['tflag'].values)
+
+    def test_station_ascii_chunks(self):
+        data, station = igra.read.ascii_to_dataframe(datafile)
+        for chunksize, blocksize, nblocks in [(50, 4096, 7), (1, 16777216, len(station))]:
+            blocks = list(igra.read.iter_ascii_to_dataframe(datafile, chunksize=chunksize, blocksize=blocksize))
+            self.assertEqual(len(blocks), nblocks)
+            pd.testing.assert_frame_equal(pd.concat([i[0] for i in blocks]), data)
+            pd.testing.assert_frame_equal(pd.concat([i[1] for i in blocks]), station)
+
+    def test_station_chunks(self):
+        data, station = igra.read.igra('AUM00011035', datafile)
+        cdata, cstation = igra.read.igra('AUM00011035', datafile, chunksize=100)
+        xr.testing.assert_identical(data, cdata)
+        xr.testing.assert_identical(station, cstation)
+
+    def test_inventory(self):
+        data, station = igra.read.ascii_to_dataframe(datafile, all_columns=True)
+        headers, summary = igra.read.inventory(datafile)
+        pd.testing.assert_frame_equal(headers, station)
+        self.assertEqual(summary['ident'], 'AUM00011035')
+        self.assertEqual(summary['soundings'], 321)
+        self.assertEqual(summary['year'].loc[2015], 321)
+        self.assertEqual(summary['numlev'].sum(), 321)
+
+    def test_sounding_index(self):
+        os.makedirs(tmpdir, exist_ok=True)
+        filename = shutil.copy(datafile, tmpdir)
+        index = igra.read.sounding_index(filename, rebuild=True)
+        self.assertTrue(os.path.isfile(filename + '.idx.npz'))
+        self.assertEqual(len(index), 321)
+        pd.testing.assert_frame_equal(index, igra.read.sounding_index(filename))
+        data, station = igra.read.read_soundings(filename, dates=index.index[[10, 200]], all_columns=True)
+        rdata, rstation = igra.read.ascii_to_dataframe(filename, all_columns=True)
+        pd.testing.assert_frame_equal(station, rstation.iloc[[10, 200]])
+        pd.testing.assert_frame_equal(data, rdata.loc[index.index[[10, 200]]])
+        # sidecar can not be written (like a read-only directory, also for root)
+        os.makedirs('%s/readonly' % tmpdir, exist_ok=True)
+        filename = shutil.copy(datafile, '%s/readonly' % tmpdir)
+        os.makedirs(filename + '.idx.npz', exist_ok=True)
+        sdata, sstation = igra.read.read_soundings(filename, dates=index.index[[10, 200]], all_columns=True)
+        pd.testing.assert_frame_equal(sdata, data)
+        self.assertEqual(sorted(os.listdir('%s/readonly' % tmpdir)), sorted([os.path.basename(filename),
+                                                                            os.path.basename(filename) + '.idx.npz']))
+
+    def test_open_dataset(self):
+        os.makedirs(tmpdir, exist_ok=True)
+        filename = shutil.copy(datafile, tmpdir)
+        data, station = igra.read.igra('AUM00011035', filename)
+        lazy = xr.open_dataset(filename, engine=igra.backend.IgraBackendEntrypoint, drop_variables=['winds'])
+        self.assertNotIn('winds', lazy.data_vars)
+        self.assertEqual(lazy.temp.attrs['units'], 'K')
+        subset = lazy.sel(date=slice('2015-03-01', '2015-03-10'))
+        xr.testing.assert_equal(subset.temp.load(), data.temp.sel(date=slice('2015-03-01', '2015-03-10')))
+        xr.testing.assert_equal(lazy.load(), data.drop_vars('winds'))
+
     def test_station_table(self):
         data, station = igra.read.igra('USM00072216', '%s/USM00072216-data.txt.zip' % tmpdir, return_table=True)
         self.assertIsInstance(data, xr.Dataset) and self.assertIsInstance(station, xr.Dataset)
 
+    def test_station_array(self):
+        table = xr.Dataset({'pres': ('date', [1000., 2000., 2000., 5000., 1000.]),
+                            'temp': ('date', [200., 210., 220., 230., 240.], {'units': 'K'}),
+                            'flag_int': ('date', [0, 0, 1, 0, 0])},
+                           coords={'date': pd.to_datetime(['2000-01-01'] * 4 + ['2000-01-02'])})
+        data = igra.read.dataframe_to_array(table, dim='date', plev='pres', levels=[1000, 2000, 3000])
+        self.assertEqual(data.temp.dims, ('date', 'pres'))
+        np.testing.assert_array_equal(data.pres.values, [1000., 2000.])
+        np.testing.assert_array_equal(data.temp.values, [[200., 210.], [240., np.nan]])
+        self.assertEqual(data.temp.attrs['units'], 'K')
+        data = igra.read.dataframe_to_array(table, dim='date', plev='pres', duplicates='last')
+        self.assertEqual(data.temp.values[0, 1], 220.)
+        data = igra.read.dataframe_to_array(table, dim='date', plev='pres', duplicates='mean')
+        self.assertEqual(data.temp.values[0, 1], 215.)
+        self.assertEqual(data.flag_int.values[0, 1], 0)  # not averaged
+        with self.assertRaises(ValueError):
+            igra.read.dataframe_to_array(table, dim='date', plev='pres', duplicates='raise')
+
     def test_metadata(self):
         data = igra.read.metadata('%s/igra2-metadata.txt' % tmpdir)
         self.assertIsInstance(data, pd.DataFrame)
@@ -58,6 +466,121 @@ class ReadTest(unittest.TestCase):
         pass
 
 
+class UpdateTest(unittest.TestCase):
+    def setUp(self):
+        import gzip
+        with gzip.open(datafile, 'rt') as f:
+            lines = f.readlines()
+        headers = [i for i, line in enumerate(lines) if line[0] == '#']
+        os.makedirs(tmpdir, exist_ok=True)
+        with open('%s/AUM00011035-data.txt' % tmpdir, 'w') as f:
+            f.writelines(lines[:headers[250]])
+        with open('%s/AUM00011035-data-beg2015.txt' % tmpdir, 'w') as f:
+            f.writelines(lines[headers[230]:])
+
+    def test_update(self):
+        data, station = igra.read.igra('AUM00011035', datafile)
+        old, ostation = igra.read.igra('AUM00011035', '%s/AUM00011035-data.txt' % tmpdir)
+        new, nstation = igra.read.update('AUM00011035', old, '%s/AUM00011035-data-beg2015.txt' % tmpdir)
+        xr.testing.assert_identical(new, data)
+        self.assertEqual(nstation.date.size, 71)
+
+    @unittest.skipIf(netCDF4 is None, "requires netCDF4")
+    def test_update_netcdf(self):
+        data, station = igra.read.igra('AUM00011035', datafile)
+        old, ostation = igra.read.igra('AUM00011035', '%s/AUM00011035-data.txt' % tmpdir)
+        for unlimited in (['date'], None):
+            old.to_netcdf('%s/AUM00011035.nc' % tmpdir, unlimited_dims=unlimited)
+            new, nstation = igra.read.update('AUM00011035', '%s/AUM00011035.nc' % tmpdir,
+                                             '%s/AUM00011035-data-beg2015.txt' % tmpdir)
+            xr.testing.assert_identical(new, data.isel(date=slice(old.date.size, None)))
+            xr.testing.assert_identical(xr.load_dataset('%s/AUM00011035.nc' % tmpdir), data)
+        # nothing new
+        new, nstation = igra.read.update('AUM00011035', '%s/AUM00011035.nc' % tmpdir,
+                                         '%s/AUM00011035-data-beg2015.txt' % tmpdir)
+        self.assertIsNone(new)
+
+
+class ManyTest(unittest.TestCase):
+    def setUp(self):
+        os.makedirs('%s/many' % tmpdir, exist_ok=True)
+        for ident in ['AUM00011031', 'AUM00011032']:
+            shutil.copy(datafile, '%s/many/%s-data.txt.gz' % (tmpdir, ident))
+
+    def test_igra_many(self):
+        idents = ['AUM00011031', 'AUM00011032', 'AUM00099999']
+        data, station, errors = igra.read.igra_many(idents, '%s/many' % tmpdir, workers=2)
+        self.assertEqual(list(data.keys()), idents[:2])
+        self.assertEqual(list(errors.keys()), idents[2:])
+        rdata, rstation = igra.read.igra('AUM00011031', datafile)
+        xr.testing.assert_identical(data['AUM00011031'], rdata)
+        data, station, errors = igra.read.igra_many(idents, '%s/many' % tmpdir, workers=1, concat=True)
+        self.assertEqual(data.temp.dims, ('station', 'date', 'pres'))
+        self.assertEqual(list(data.station.values), idents[:2])
+        # first error is raised from the pool as well
+        for workers in (1, 2):
+            with self.assertRaises(OSError):
+                igra.read.igra_many(idents, '%s/many' % tmpdir, workers=workers, debug=True)
+
+    def test_archive(self):
+        if netCDF4 is None:
+            self.skipTest("netCDF4 missing")
+        filename = '%s/many/network.nc' % tmpdir
+        data, station, errors = igra.read.igra_many(['AUM00011031', 'AUM00011032'], '%s/many' % tmpdir, workers=1)
+        first = {i: j.sel(date=slice(None, '2015-03-31')) for i, j in data.items()}
+        igra.archive.write(first, filename, station={i: j.sel(date=slice(None, '2015-03-31'))
+                                                     for i, j in station.items()})
+        self.assertEqual(igra.archive.append(data, filename, station=station), 183)
+        self.assertEqual(igra.archive.append(data, filename, station=station), 0)
+        with self.assertRaises(ValueError):
+            igra.archive.append({'AUM00099999': data['AUM00011031']}, filename)
+        network = xr.load_dataset(filename)
+        self.assertEqual(network.temp.dims, ('station', 'date', 'pres'))
+        self.assertEqual(network.temp.encoding['dtype'], np.dtype('int16'))
+        xr.testing.assert_allclose(network.temp.sel(station='AUM00011032', drop=True), data['AUM00011032'].temp,
+                                   atol=0.005)
+        xr.testing.assert_allclose(network.lat.sel(station='AUM00011031', drop=True), station['AUM00011031'].lat)
+
+
+class CacheTest(unittest.TestCase):
+    def test_table(self):
+        cachedir = '%s/cache' % tmpdir
+        igra.cache.clear(cachedir)
+        data, station = igra.read.ascii_to_dataframe(datafile, all_columns=True)
+        for i in range(2):
+            cdata, cstation = igra.cache.table(datafile, cache=cachedir, all_columns=True)
+            pd.testing.assert_frame_equal(cdata, data)
+            pd.testing.assert_frame_equal(cstation, station)
+        self.assertEqual(len(os.listdir(cachedir)), 1)
+
+    def test_station(self):
+        data, station = igra.read.igra('AUM00011035', datafile)
+        cdata, cstation = igra.read.igra('AUM00011035', datafile, cache='%s/cache' % tmpdir)
+        xr.testing.assert_identical(data, cdata)
+        xr.testing.assert_identical(station, cstation)
+
+    def test_evict(self):
+        cachedir = '%s/cache-evict' % tmpdir
+        igra.cache.clear(cachedir)
+        igra.cache.table(datafile, cache=cachedir)
+        igra.cache.table(datafile, cache=cachedir, all_columns=True, maxsize=1)
+        self.assertEqual(len(os.listdir(cachedir)), 1)
+
+    def test_shared(self):
+        # many readers and writers of one cache directory, entries are evicted meanwhile
+        from concurrent.futures import ThreadPoolExecutor
+        cachedir = '%s/cache-shared' % tmpdir
+        igra.cache.clear(cachedir)
+        data, station = igra.read.ascii_to_dataframe(datafile)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda i: igra.cache.table(datafile, cache=cachedir, start=str(2000 + i % 2),
+                                                               maxsize=1), range(16)))
+        for cdata, cstation in results:
+            pd.testing.assert_frame_equal(cdata, data)
+        self.assertFalse(any(i.endswith('.tmp') for i in os.listdir(cachedir)))
+        self.assertIsNone(igra.cache._read('%s/missing.npz' % cachedir))
+
+
 # todo add Interpolation test
 class InterpTest(unittest.TestCase):
     def test_standard_pressure(self):
@@ -72,6 +595,36 @@ class InterpTest(unittest.TestCase):
     def test_interpolation(self):
         pass
 
+    def test_engine(self):
+        data, station = igra.read.ascii_to_dataframe(datafile)
+        data = data[np.isfinite(data.pres)]
+        for levels in (igra.std_plevels, igra.era_plevels, [10000., 20000., 50000., 85000.]):
+            rdata = igra.interp.dataframe(data, 'pres', levels=levels, engine='python')
+            idata = igra.interp.dataframe(data, 'pres', levels=levels)
+            pd.testing.assert_frame_equal(idata, rdata, check_exact=True)
+            rdata = rdata[rdata.pres.isin(levels)]
+            idata = igra.interp.dataframe(data, 'pres', levels=levels, only_levels=True)
+            pd.testing.assert_frame_equal(idata, rdata, check_exact=True)
+
+    def test_engine_height(self):
+        data, station = igra.read.ascii_to_dataframe(datafile)
+        data = data[np.isfinite(data.gph)]
+        levels = [500., 1000., 1500., 2000., 3000., 5000., 10000.]
+        rdata = igra.interp.dataframe(data, 'gph', levels=levels, engine='python', log=False)
+        idata = igra.interp.dataframe(data, 'gph', levels=levels, log=False)
+        pd.testing.assert_frame_equal(idata, rdata, check_exact=True)
+        # linear in height
+        one = data.loc[data.index[0]]
+        one = one[np.isfinite(one['temp'])].sort_values('gph')
+        np.testing.assert_allclose(idata.loc[data.index[0]].set_index('gph').loc[levels[1:], 'temp'],
+                                   np.interp(levels[1:], one['gph'], one['temp']))
+        hdata, hstation = igra.read.igra('AUM00011035', datafile, levels=levels, vertical='gph')
+        self.assertEqual(dict(hdata.sizes), {'date': 321, 'gph': 7})
+        self.assertEqual(hdata['gph'].attrs['axis'], 'Z')
+        tdata, tstation = igra.read.igra('AUM00011035', datafile, levels=levels, vertical='gph', variables=['temp'],
+                                         chunksize=100)
+        xr.testing.assert_identical(tdata, hdata[['temp']])
+
 
 if __name__ == '__main__':
     unittest.main()
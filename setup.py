@@ -24,6 +24,7 @@ setuptools.setup(
     ],
     packages=setuptools.find_packages(),
     install_requires=['requests', 'numpy', 'pandas', 'xarray'],
+    entry_points={'xarray.backends': ['igra = igra.backend:IgraBackendEntrypoint']},
     python_requires='>=3.6'
 )
 